@@ -0,0 +1,53 @@
+'''Run the benchmark suite.
+
+Run with ``python -m benchmarks [--output results.json] [--repeat N] [names...]``,
+and compare the results with ``python -m benchmarks.compare``. To update
+the stored baseline, run ``python -m benchmarks --output benchmarks/baseline.json``.
+'''
+import argparse
+import json
+import platform
+import sys
+from timeit import Timer
+from typing import Any, Dict, List, Optional
+
+from .suite import Case, cases
+
+
+def measure(f: Case, repeat: int, min_time: float) -> float:
+    'Return the best time per call in seconds.'
+    timer = Timer(f)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*', help='only run these cases')
+    parser.add_argument('--output', '-o', help='write the results to this JSON file')
+    parser.add_argument('--repeat', '-r', type=int, default=5, help='number of repetitions, the best one counts')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum duration of one repetition')
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(cases)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+    results: Dict[str, float] = {}
+    for name, f in cases.items():
+        if args.names and name not in args.names:
+            continue
+        results[name] = measure(f, args.repeat, args.min_time)
+        print(f'{name:>24}: {results[name] * 1e6:12.2f} us   {f.__doc__}', flush=True)
+    if args.output:
+        report: Dict[str, Any] = {
+            'python': platform.python_implementation() + ' ' + platform.python_version(),
+            'machine': platform.machine(),
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,54 @@
+'''Measure the memory used by a constructed node tree.
+
+Run with ``python -m benchmarks.bench_memory [rows] [columns]``.
+'''
+import sys
+import tracemalloc
+from typing import Any, Iterator, Tuple
+
+from generate_html import fragment, tag
+from generate_html.nodes import Node
+
+
+@fragment
+def table(rows: int, columns: int) -> Iterator:
+    with tag.table():
+        for row in range(rows):
+            with tag.tr():
+                for column in range(columns):
+                    yield tag.td(f'{row}:{column}')
+
+
+def count_objects(root: Node) -> int:
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for child in node.children:
+            if isinstance(child, Node):
+                stack.append(child)
+            else:
+                count += 1
+    return count
+
+
+def measure(rows: int, columns: int) -> Tuple[Any, int]:
+    tracemalloc.start()
+    try:
+        result = table(rows, columns)
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def main(rows: int = 10_000, columns: int = 50) -> None:
+    result, size = measure(rows, columns)
+    objects = count_objects(result)
+    print(f'{rows * columns} cells, {objects} nodes and text children: {size / 2 ** 20:.1f} MiB, '
+          f'{size / objects:.1f} bytes per node')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
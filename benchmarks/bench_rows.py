@@ -0,0 +1,41 @@
+'''Compare building a large table node by node with table_rows.
+
+Run with ``python -m benchmarks.bench_rows [rows]``.
+'''
+import sys
+from time import perf_counter
+from typing import Any, Iterator, List, Tuple
+
+from generate_html import fragment, render_html, table_rows, tag
+
+
+def row(number: Any, name: Any, price: Any, stock: Any) -> Iterator:
+    with tag.tr(data_id=number):
+        yield tag.td(number)
+        yield tag.td(name, class_='name')
+        yield tag.td(price, class_='price')
+        yield tag.td(stock)
+
+
+@fragment
+def node_table(records: List[Tuple]) -> Iterator:
+    with tag.table():
+        for record in records:
+            yield from row(*record)
+
+
+@fragment
+def bulk_table(records: List[Tuple]) -> Iterator:
+    yield tag.table(table_rows(row, records))
+
+
+def main(rows: int = 100_000) -> None:
+    records = [(i, f'product <{i}>', i * 1.5, i % 7) for i in range(rows)]
+    for name, table in [('nodes', node_table), ('table_rows', bulk_table)]:
+        start = perf_counter()
+        html = render_html(table(records))
+        print(f'{name:>12}: {perf_counter() - start:.3f}s ({len(html)} characters)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,57 @@
+'''Compare the iterative serializer with the recursive one it replaced.
+
+Run with ``python -m benchmarks.bench_serializer [depth] [width]``.
+'''
+import sys
+from time import perf_counter
+from typing import Callable, Iterator
+
+from generate_html.nodes import Element, ElementCollection, Node, child_html
+
+
+def recursive_generate_html(node: Node) -> Iterator[str]:
+    yield node.start_html()
+    for item in node.children:
+        if isinstance(item, Node):
+            yield from recursive_generate_html(item)
+        else:
+            yield child_html(item)
+    yield node.end_html()
+
+
+def iterative_generate_html(node: Node) -> Iterator[str]:
+    return node.generate_html()
+
+
+def deep_tree(depth: int) -> Node:
+    root = innermost = Element([], 'div', {})
+    for _ in range(depth - 1):
+        child = Element([], 'div', {})
+        innermost.children.append(child)
+        innermost = child
+    return root
+
+
+def wide_tree(width: int) -> Node:
+    return ElementCollection([Element([], 'span', {}) for _ in range(width)])
+
+
+def measure(name: str, generate: Callable[[Node], Iterator[str]], tree: Node) -> None:
+    start = perf_counter()
+    try:
+        html = ''.join(generate(tree))
+    except RecursionError:
+        print(f'{name:>30}: RecursionError')
+        return
+    print(f'{name:>30}: {perf_counter() - start:8.3f}s ({len(html)} characters)')
+
+
+def main(depth: int = 10_000, width: int = 1_000_000) -> None:
+    for label, tree in [(f'{depth} levels deep', deep_tree(depth)), (f'{width} nodes wide', wide_tree(width))]:
+        print(label)
+        measure('recursive', recursive_generate_html, tree)
+        measure('iterative', iterative_generate_html, tree)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,59 @@
+'''Compare two sets of benchmark results.
+
+Run with ``python -m benchmarks.compare [--threshold 0.1] [baseline] current``,
+where the baseline defaults to ``benchmarks/baseline.json``. Exits with
+status 1 if any case got slower by more than the threshold (a fraction of
+the baseline time), so it can be used in CI.
+'''
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BASELINE = Path(__file__).with_name('baseline.json')
+
+
+def load(path: str) -> Dict[str, float]:
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float], threshold: float) -> List[str]:
+    'Print a comparison table and return the names of the cases that regressed.'
+    regressions = []
+    for name in sorted(baseline.keys() | current.keys()):
+        if name not in baseline or name not in current:
+            print(f'{name:>24}: only in {"current" if name in current else "baseline"} results')
+            continue
+        ratio = current[name] / baseline[name]
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            verdict = 'REGRESSION'
+        elif ratio < 1 - threshold:
+            verdict = 'faster'
+        else:
+            verdict = ''
+        print(f'{name:>24}: {baseline[name] * 1e6:12.2f} us -> {current[name] * 1e6:12.2f} us'
+              f'  ({ratio - 1:+7.1%}) {verdict}')
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.compare', description=__doc__.split('\n')[0])
+    parser.add_argument('files', nargs='+', metavar='file', help='[baseline] current')
+    parser.add_argument('--threshold', '-t', type=float, default=0.1,
+                        help='allowed slowdown as a fraction, default 0.1')
+    args = parser.parse_args(argv)
+    if len(args.files) > 2:
+        parser.error('expected at most two files')
+    baseline_path = args.files[0] if len(args.files) == 2 else str(BASELINE)
+    regressions = compare(load(baseline_path), load(args.files[-1]), args.threshold)
+    if regressions:
+        print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
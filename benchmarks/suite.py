@@ -0,0 +1,212 @@
+'''The benchmark cases run by ``python -m benchmarks``.
+
+Every case is a function without arguments that does the measured work
+once. Page-level cases construct and render a complete tree; the micro
+cases time a single building block.
+'''
+from typing import Any, Callable, Dict, Iterator, List, Tuple, cast
+
+from generate_html import (HTML, component, contents, document, escape,
+                           fragment, render_html, tag)
+from generate_html.context import NodeStack
+from generate_html.interface import create_element
+from generate_html.nodes import Element, ElementCollection
+from generate_html.serialization import dumps, loads
+
+Case = Callable[[], Any]
+
+cases: Dict[str, Case] = {}
+
+
+def case(f: Case) -> Case:
+    cases[f.__name__] = f
+    return f
+
+
+RECORDS: List[Tuple[int, str, float, int]] = [(i, f'product <{i}>', i * 1.5, i % 7) for i in range(1000)]
+
+
+@fragment
+def wide_table_fragment(records: List[Tuple[int, str, float, int]]) -> Iterator:
+    with tag.table():
+        for number, name, price, stock in records:
+            with tag.tr():
+                yield tag.td(number)
+                yield tag.td(name)
+                yield tag.td(price)
+                yield tag.td(stock)
+
+
+@case
+def wide_table() -> str:
+    'A table with 1000 rows of 4 cells.'
+    return render_html(wide_table_fragment(RECORDS))
+
+
+@fragment
+def nested(depth: int) -> Iterator:
+    if depth:
+        with tag.div(class_='level'):
+            yield nested(depth - 1)
+    else:
+        yield 'bottom'
+
+
+@case
+def deep_nesting() -> str:
+    'A fragment nesting itself 200 levels deep.'
+    return render_html(nested(200))
+
+
+@component
+def card(title: str) -> Iterator:
+    with tag.div(class_='card'):
+        yield tag.h2(title)
+        with tag.div(class_='card-body'):
+            yield contents()
+
+
+@component
+def items(values: List[str]) -> Iterator:
+    with tag.ul():
+        for value in values:
+            with tag.li():
+                yield contents(value)
+
+
+@fragment
+def component_page_fragment() -> Iterator:
+    for section in range(50):
+        with card(f'Section {section}'):
+            for value in items([f'item {i}' for i in range(10)]):
+                yield tag.span(value)
+
+
+@case
+def component_page() -> str:
+    '50 card components, each iterating over a list component of 10 items.'
+    return render_html(component_page_fragment())
+
+
+@fragment
+def attribute_fragment() -> Iterator:
+    with tag.form(action='/submit', method='post', class_=['form', 'form-wide']):
+        for i in range(300):
+            yield tag.input(type='text', name=f'field{i}', id=f'field-{i}', value=f'"value" {i}',
+                            data_index=i, data_label=f'Field <{i}>', required=i % 2 == 0, disabled=False)
+
+
+@case
+def attribute_heavy() -> str:
+    '300 inputs with eight attributes each.'
+    return render_html(attribute_fragment())
+
+
+TEXT = [f'Tom & Jerry say "<hello>" #{i}' if i % 2 else f'plain text number {i}' for i in range(2000)]
+
+
+@fragment
+def escaping_fragment() -> Iterator:
+    with tag.div():
+        for text in TEXT:
+            yield tag.p(text)
+
+
+@case
+def escaping_heavy() -> str:
+    '2000 paragraphs, half of which need escaping.'
+    return render_html(escaping_fragment())
+
+
+@document
+def full_document_page(records: List[Tuple[int, str, float, int]]) -> Iterator:
+    with tag.head():
+        yield tag.meta(charset='utf-8')
+        yield tag.title('Products')
+        yield tag.link(rel='stylesheet', href='/static/style.css')
+        yield tag.script('if (a < b && c > d) { start(); }')
+    with tag.body():
+        with tag.nav():
+            with tag.ul():
+                for i in range(10):
+                    yield tag.li(tag.a(f'Link {i}', href=f'/page/{i}'))
+        with tag.main():
+            with card('Products'):
+                yield wide_table_fragment(records[:200])
+        yield tag.footer('© example')
+
+
+@case
+def full_document() -> str:
+    'A document with a head, navigation, a card and a 200 row table.'
+    return render_html(full_document_page(RECORDS))
+
+
+@case
+def micro_create_element() -> Element:
+    'create_element with one child and two attributes.'
+    return create_element('a', ['text'], {'href': '/', 'class': 'link'})
+
+
+CHILD = Element([], 'span', {})
+
+
+@case
+def micro_stack_add() -> None:
+    '100 NodeStack.add calls.'
+    stack = NodeStack([ElementCollection([])])
+    for _ in range(100):
+        stack.add(CHILD)
+
+
+@component
+def three_steps() -> Iterator:
+    yield 'a'
+    yield contents()
+    yield 'b'
+
+
+@fragment
+def component_steps_fragment() -> Iterator:
+    for _ in range(100):
+        with three_steps():
+            yield 'c'
+        for _ in three_steps():
+            yield 'd'
+
+
+@case
+def micro_component() -> HTML:
+    '100 components used with ``with`` and 100 with ``for``.'
+    return component_steps_fragment()
+
+
+@case
+def micro_escape() -> None:
+    'escape on 100 short strings, half of them with special characters.'
+    for text in TEXT[:100]:
+        escape(text)
+
+
+TREE = cast(ElementCollection, wide_table_fragment(RECORDS[:100]))
+
+
+@case
+def micro_generate_html() -> str:
+    'Serializing an already constructed table of 100 rows.'
+    return ''.join(TREE.generate_html())
+
+
+SERIALIZED_TABLE = dumps(wide_table_fragment(RECORDS))
+
+
+@case
+def load_serialized() -> HTML:
+    'Loading the tree of wide_table with ``serialization.loads``, for comparison with building it.'
+    return loads(SERIALIZED_TABLE)
+
+
+@case
+def build_table() -> HTML:
+    'Building the tree of wide_table without rendering it.'
+    return wide_table_fragment(RECORDS)
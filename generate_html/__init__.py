@@ -1,8 +1,15 @@
 __version__ = '1.0.0'
 
 from .html import HTML, escape, into_html, render_html
-from .components import Component
-from .interface import comment, component, contents, document, fragment, tag, create_element
+from .components import AsyncComponent, Component
+from .interface import comment, component, contents, document, fragment, tag, create_element, table_rows, lazy
+from .batch import render_many
+from .caching import LRU
+from .fragment_cache import cached
+from .interning import interning
+from .parallel import parallel
+from .streaming import aiter_html, iter_gzip, iter_html, render_bytes, render_html_async, render_to
 
 __all__ = ['HTML', 'escape', 'into_html', 'render_html', 'Component', 'comment', 'component', 'contents', 'document',
-           'fragment', 'tag', 'create_element']
+           'fragment', 'tag', 'create_element', 'iter_html', 'AsyncComponent', 'aiter_html', 'render_html_async',
+           'render_bytes', 'render_to', 'render_many', 'table_rows', 'LRU', 'cached', 'lazy', 'iter_gzip', 'interning', 'parallel']
@@ -0,0 +1,75 @@
+'''Rendering many documents in parallel, using a pool of worker processes.'''
+import pickle
+from dataclasses import dataclass
+from functools import partial
+from inspect import iscoroutine
+from traceback import format_exc
+from typing import (Any, Callable, Iterable, Iterator, Optional, Sequence,
+                    Tuple)
+
+from .context import NodeStack, current_node_stack
+from .html import render_html
+
+
+@dataclass
+class RenderResult:
+    '''The outcome of rendering one item with :func:`render_many`.
+
+    ``index`` is the position of the arguments in the iterable that was
+    passed in. Exactly one of ``html`` and ``error`` is set.'''
+    index: int
+    html: Optional[str] = None
+    error: Optional[BaseException] = None
+    traceback: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _initialize_worker() -> None:
+    current_node_stack.set(NodeStack([]))
+
+
+def _render_one(f: Callable[..., Any], item: Tuple[int, Sequence[Any]]) -> RenderResult:
+    index, args = item
+    try:
+        result = f(*args)
+        if iscoroutine(result):
+            # only imported when needed, since it takes a while
+            import asyncio
+            result = asyncio.run(result)
+        return RenderResult(index, html=render_html(result))
+    except Exception as exc:
+        try:
+            pickle.dumps(exc)
+        except Exception:
+            exc = RuntimeError(f'{type(exc).__qualname__}: {exc}')
+        return RenderResult(index, error=exc, traceback=format_exc())
+
+
+def render_many(f: Callable[..., Any], arg_iterable: Iterable[Sequence[Any]], *, workers: Optional[int] = None,
+                ordered: bool = True, chunksize: int = 1) -> Iterator[RenderResult]:
+    '''Call ``f`` with each sequence of arguments and render the results, in worker processes.
+
+    ::
+
+        for result in render_many(product_page, [(product,) for product in catalog], workers=8):
+            if result.ok:
+                write_page(result.index, result.html)
+
+    ``f`` is typically a :func:`document` or :func:`fragment` (async ones
+    are fine too) and has to be importable by the workers, as do its
+    arguments. Exceptions raised while rendering an item are reported in its
+    :class:`RenderResult` instead of being raised. Results are yielded in the
+    order of ``arg_iterable``, or as they complete if ``ordered`` is false.
+    '''
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    render = partial(_render_one, f)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker) as executor:
+        if ordered:
+            yield from executor.map(render, enumerate(arg_iterable), chunksize=chunksize)
+        else:
+            futures = [executor.submit(render, item) for item in enumerate(arg_iterable)]
+            for future in as_completed(futures):
+                yield future.result()
@@ -0,0 +1,226 @@
+'''Memoization of fragments, documents and components.'''
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from threading import Lock
+from time import monotonic
+from types import TracebackType
+from typing import (Any, Callable, Dict, Hashable, Iterator, List, Optional,
+                    Sequence, Tuple, Type)
+
+from .components import Component, ComponentContents, InvalidHTML
+from .context import NodeStack, current_node_stack, get_stack
+from .html import HTML
+from .nodes import ElementCollection, Node
+
+MISSING = object()
+
+
+def make_key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Hashable, ...]:
+    '''The cache key for a call with these arguments.
+
+    Like ``functools.lru_cache(typed=True)``, the types of the arguments are
+    part of the key, so ``f(1)``, ``f(1.0)`` and ``f(True)`` are cached
+    separately.'''
+    types = tuple(type(value) for value in args)
+    if kwargs:
+        items = tuple(sorted(kwargs.items()))
+        return args, types, items, tuple(type(value) for _, value in items)
+    return args, types
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    size: int
+    maxsize: Optional[int]
+
+
+class LRU:
+    '''A least recently used cache, for the ``cache`` argument of
+    :func:`fragment`, :func:`document` and :func:`component`::
+
+        @fragment(cache=LRU(maxsize=1000, ttl=60))
+        def user_badge(user_id, name):
+            ...
+
+    Results are looked up by the arguments of the call, so these have to be
+    hashable (calls with unhashable arguments are not cached) and the
+    decorated function should depend on nothing else. Entries older than
+    ``ttl`` seconds are discarded. Use a separate cache for each function.
+
+    Fragments and documents are cached as their rendered :class:`HTML`,
+    so every call gets the same immutable result.
+    '''
+    def __init__(self, maxsize: Optional[int] = 128, ttl: Optional[float] = None,
+                 timer: Callable[[], float] = monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Optional[float], Any]]' = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Any:
+        'Return the value stored for ``key``, or ``MISSING``.'
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or self.timer() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = None if self.ttl is None else self.timer() + self.ttl
+        with self._lock:
+            self._entries[key] = expires, value
+            self._entries.move_to_end(key)
+            if self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *args: Any, **kwargs: Any) -> bool:
+        '''Remove the entry for a call with these arguments.
+
+        Returns whether there was such an entry.'''
+        with self._lock:
+            return self._entries.pop(make_key(args, kwargs), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, len(self._entries), self.maxsize)
+
+
+def cache_node_function(construct: Callable[..., Any], cache: LRU) -> Callable[..., Any]:
+    'Wrap a fragment or document constructor so its results are cached as rendered HTML.'
+    @wraps(construct)
+    def cached(*args: Any, **kwargs: Any) -> Any:
+        key = make_key(args, kwargs)
+        try:
+            value = cache.get(key)
+        except TypeError:
+            return construct(*args, **kwargs)
+        if value is MISSING:
+            value = construct(*args, **kwargs)
+            if isinstance(value, Node):
+                # a node could be changed by whoever receives it, which would change later hits too
+                value = HTML(value.__html__())
+            cache.set(key, value)
+        return value
+    return cached
+
+
+def cache_async_node_function(construct: Callable[..., Any], cache: LRU) -> Callable[..., Any]:
+    @wraps(construct)
+    async def cached(*args: Any, **kwargs: Any) -> Any:
+        key = make_key(args, kwargs)
+        try:
+            value = cache.get(key)
+        except TypeError:
+            return await construct(*args, **kwargs)
+        if value is MISSING:
+            value = await construct(*args, **kwargs)
+            if isinstance(value, Node):
+                # a node could be changed by whoever receives it, which would change later hits too
+                value = HTML(value.__html__())
+            cache.set(key, value)
+        return value
+    return cached
+
+
+class ContentsMarker(HTML):
+    __slots__ = ()
+    MARKER = '\0contents\0'
+
+    def __init__(self) -> None:
+        pass
+
+    def __html__(self) -> str:
+        return self.MARKER
+
+
+def capture_component(f: Callable[..., Iterator], args: Tuple[Any, ...],
+                      kwargs: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+    '''Run a component function on its own, returning the HTML around each
+    ``contents()`` and the values passed to them.'''
+    contents: List[Any] = []
+    stack = NodeStack([])
+    token = current_node_stack.set(stack)
+    try:
+        with stack.yield_element(ElementCollection([])) as top:
+            for item in f(*args, **kwargs):
+                if isinstance(item, ComponentContents):
+                    contents.append(item.args)
+                    stack.add(ContentsMarker())
+                else:
+                    stack.add(item)
+    finally:
+        current_node_stack.reset(token)
+    segments: List[str] = []
+    pieces: List[str] = []
+    for piece in top.generate_html():
+        if piece is ContentsMarker.MARKER:
+            segments.append(''.join(pieces))
+            pieces.clear()
+        else:
+            pieces.append(piece)
+    segments.append(''.join(pieces))
+    return segments, contents
+
+
+class CachedComponent(Component):
+    '''Replays a component from the HTML captured around its ``contents()``.
+
+    Instead of nesting the contents in elements, the HTML before and after
+    them is added as-is, which renders the same.'''
+    def __init__(self, segments: Sequence[str], contents: Sequence[Any]) -> None:  # noqa: super().__init__ not called
+        self.segments = segments
+        self.contents = contents
+
+    def __iter__(self) -> Iterator:
+        stack = get_stack()
+        for segment, args in zip(self.segments, self.contents):
+            if segment:
+                stack.add(HTML(segment))
+            yield args
+        if self.segments[-1]:
+            stack.add(HTML(self.segments[-1]))
+
+    def __enter__(self) -> Any:
+        if not self.contents:
+            raise InvalidHTML('component does not contain an instance of contents()')
+        if self.segments[0]:
+            get_stack().add(HTML(self.segments[0]))
+        return self.contents[0]
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        if exc_type is not None:
+            return
+        if len(self.contents) > 1:
+            raise InvalidHTML('component invoked as as a context manager, but has multiple instances of contents()')
+        if self.segments[1]:
+            get_stack().add(HTML(self.segments[1]))
+
+
+def cache_component_function(f: Callable[..., Iterator], cache: LRU) -> Callable[..., Any]:
+    def cached(*args: Any, **kwargs: Any) -> Any:
+        key = make_key(args, kwargs)
+        try:
+            value = cache.get(key)
+        except TypeError:
+            return Component(f, *args, **kwargs)
+        if value is MISSING:
+            value = capture_component(f, args, kwargs)
+            cache.set(key, value)
+        return CachedComponent(*value)
+    return cached
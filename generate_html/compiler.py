@@ -0,0 +1,270 @@
+'''Compilation of fragment and document functions into string templates.
+
+A compiled function is traced once, by calling it with a :class:`Placeholder`
+for each argument. If the arguments are only ever yielded or used as
+attribute values, the resulting tree is turned into a :class:`Template`: a
+sequence of static strings with slots for the arguments. Later calls only
+escape the arguments and join the strings.
+
+Anything that inspects an argument (comparing it, iterating over it,
+converting it to a string, accessing an attribute, ...) makes the function
+impossible to trace, in which case it is called the normal way instead.
+Identity checks such as ``arg is None`` and ``isinstance`` cannot be
+detected while tracing, so functions that use ``is``, ``isinstance`` or
+``issubclass``, or have a parameter that defaults to ``None``, are not
+compiled either. Everything that does not depend on the arguments is
+evaluated only once.
+'''
+import dis
+from contextvars import ContextVar, copy_context
+from inspect import Parameter, signature
+from types import CodeType
+from typing import (Any, Callable, Dict, Iterator, List, NoReturn, Optional,
+                    Sequence, Tuple, Type, Union)
+
+from .components import Component
+from .context import NodeStack, current_node_stack
+from .html import HTML, RAW_TEXT_ELEMENTS, escape, serialize_attribute
+from .nodes import Element, LazyNode, Node, child_html
+from .profiling import current_profiler, node_kind
+
+tracing: ContextVar[bool] = ContextVar('tracing', default=False)
+
+
+class UntraceableError(TypeError):
+    pass
+
+
+class Placeholder(HTML):
+    'Stands in for an argument while a function is traced.'
+    def __init__(self, index: int, name: str) -> None:
+        self.index = index
+        self.name = name
+
+    def _untraceable(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise UntraceableError(f'argument {self.name!r} is used in a way that cannot be compiled')
+
+    def __getattr__(self, key: str) -> Any:
+        self._untraceable()
+
+    __html__ = __str__ = __repr__ = __format__ = __bool__ = __len__ = __iter__ = __contains__ = _untraceable
+    __getitem__ = __call__ = __hash__ = __int__ = __float__ = __index__ = __neg__ = _untraceable
+    __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = _untraceable  # type: ignore
+    __add__ = __radd__ = __sub__ = __rsub__ = __mul__ = __rmul__ = _untraceable
+    __truediv__ = __rtruediv__ = __floordiv__ = __rfloordiv__ = __mod__ = __rmod__ = _untraceable
+
+
+class ChildSlot:
+    def __init__(self, index: int, raw: bool) -> None:
+        self.index = index
+        self.raw = raw
+
+    def __call__(self, values: Sequence[Any]) -> str:
+        value = values[self.index]
+        if self.raw:
+            return value.__html__() if isinstance(value, HTML) else str(value)
+        if isinstance(value, HTML):
+            return value.__html__()
+        if isinstance(value, Component):
+            raise TypeError('trying to use a component as a fragment, use it as a context manager or iterable instead')
+        return escape(value)
+
+
+class AttributeSlot:
+    def __init__(self, index: int, key: str) -> None:
+        self.index = index
+        self.key = key
+
+    def __call__(self, values: Sequence[Any]) -> str:
+        return serialize_attribute(self.key, values[self.index])
+
+
+Slot = Union[ChildSlot, AttributeSlot]
+
+
+class Template:
+    'Static strings interleaved with slots that are filled in from argument values.'
+    def __init__(self, parts: Sequence[Union[str, Slot]]) -> None:
+        self.first = ''
+        self.rest: List[Tuple[Slot, str]] = []
+        for part in parts:
+            if isinstance(part, str):
+                if self.rest:
+                    slot, static = self.rest[-1]
+                    self.rest[-1] = slot, static + part
+                else:
+                    self.first += part
+            else:
+                self.rest.append((part, ''))
+
+    def render(self, values: Sequence[Any]) -> str:
+        pieces = [self.first]
+        for slot, static in self.rest:
+            pieces.append(slot(values))
+            pieces.append(static)
+        return ''.join(pieces)
+
+    @classmethod
+    def from_node(cls, root: Node) -> 'Template':
+        parts: List[Union[str, Slot]] = [root.start_html()]
+        stack = [(iter(root.children), root.end_html(), root)]
+        while stack:
+            children, end, parent = stack[-1]
+            for item in children:
+                if item.__class__ is str:
+                    parts.append(item)
+                elif isinstance(item, Placeholder):
+                    raw = isinstance(parent, Element) and parent.tagname in RAW_TEXT_ELEMENTS
+                    parts.append(ChildSlot(item.index, raw))
+                elif isinstance(item, LazyNode):
+                    raise UntraceableError('lazy children cannot be compiled')
+                elif isinstance(item, Node):
+                    if item.frozen:
+                        parts.append(item.__html__())
+                        continue
+                    if isinstance(item, Element) and item._attributes and _has_placeholders(item._attributes):
+                        parts.extend(_start_tag_parts(item))
+                    else:
+                        parts.append(item.start_html())
+                    stack.append((iter(item.children), item.end_html(), item))
+                    break
+                else:
+                    parts.append(child_html(item))
+            else:
+                stack.pop()
+                parts.append(end)
+        return cls(parts)
+
+
+def _has_placeholders(attributes: Dict[str, Any]) -> bool:
+    return any(isinstance(value, Placeholder) for value in attributes.values())
+
+
+def _start_tag_parts(element: Element) -> Iterator[Union[str, Slot]]:
+    yield '<' + element.tagname
+    for key, value in (element._attributes or {}).items():
+        if isinstance(value, Placeholder):
+            yield AttributeSlot(value.index, key)
+        else:
+            yield serialize_attribute(key, value)
+    yield '>'
+
+
+UNTRACEABLE_NAMES = frozenset({'isinstance', 'issubclass'})
+
+
+def _may_branch_untraceably(f: Callable[..., Any], parameters: Sequence[Parameter]) -> bool:
+    '''Whether ``f`` could make decisions about its arguments that tracing
+    does not notice, such as ``arg is None`` or ``isinstance(arg, str)``.'''
+    if any(parameter.default is None for parameter in parameters):
+        return True
+    code = getattr(f, '__code__', None)
+    if code is None:
+        return True
+    codes = [code]
+    while codes:
+        code = codes.pop()
+        if not UNTRACEABLE_NAMES.isdisjoint(code.co_names):
+            return True
+        for instruction in dis.get_instructions(code):
+            # Python 3.8 compares identity with COMPARE_OP, later versions with IS_OP
+            if instruction.opname == 'IS_OP' or (instruction.opname == 'COMPARE_OP' and
+                                                 instruction.argval in ('is', 'is not')):
+                return True
+        # nested functions, comprehensions and generator expressions
+        codes.extend(const for const in code.co_consts if isinstance(const, CodeType))
+    return False
+
+
+class TemplateCompiler:
+    '''Calls a fragment or document function through a template,
+    which is traced on the first call.'''
+    def __init__(self, f: Callable[..., Iterator], top_level: Type[Node],
+                 construct: Callable[..., HTML]) -> None:
+        self.f = f
+        self.top_level = top_level
+        self.construct = construct
+        self.signature = signature(f)
+        self.names = list(self.signature.parameters)
+        self.parameters = [(name, parameter.default, parameter.kind != Parameter.POSITIONAL_ONLY)
+                           for name, parameter in self.signature.parameters.items()]
+        self.positional_count = sum(parameter.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)
+                                    for parameter in self.signature.parameters.values())
+        self.traced = False
+        self.template: Optional[Template] = None
+
+    def trace(self) -> Optional[Template]:
+        if _may_branch_untraceably(self.f, list(self.signature.parameters.values())):
+            return None
+        args: List[Placeholder] = []
+        kwargs: Dict[str, Placeholder] = {}
+        for index, (name, parameter) in enumerate(self.signature.parameters.items()):
+            if parameter.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
+                return None
+            if parameter.kind == Parameter.KEYWORD_ONLY:
+                kwargs[name] = Placeholder(index, name)
+            else:
+                args.append(Placeholder(index, name))
+        try:
+            root = copy_context().run(self._trace_in_context, args, kwargs)
+            return Template.from_node(root)
+        except Exception:
+            return None
+
+    def _trace_in_context(self, args: List[Placeholder], kwargs: Dict[str, Placeholder]) -> Node:
+        tracing.set(True)
+        current_node_stack.set(NodeStack([]))
+        root = self.construct(self.f, self.top_level, *args, **kwargs)
+        assert isinstance(root, Node)
+        return root
+
+    def bind(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Sequence[Any]:
+        if not kwargs and len(args) == self.positional_count == len(self.names):
+            return args
+        if len(args) <= self.positional_count:
+            values = list(args)
+            used = 0
+            for name, default, by_keyword in self.parameters[len(args):]:
+                if by_keyword and name in kwargs:
+                    values.append(kwargs[name])
+                    used += 1
+                elif default is not Parameter.empty:
+                    values.append(default)
+                else:
+                    break
+            else:
+                if used == len(kwargs):
+                    return values
+        # let inspect sort out the details, including raising the appropriate TypeError
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return [bound.arguments[name] for name in self.names]
+
+    def get_template(self) -> Optional[Template]:
+        if not self.traced:
+            self.template = self.trace()
+            self.traced = True
+        return self.template
+
+    def __call__(self, *args: Any, **kwargs: Any) -> HTML:
+        if tracing.get():
+            return self.construct(self.f, self.top_level, *args, **kwargs)
+        template = self.get_template()
+        if template is None:
+            return self.construct(self.f, self.top_level, *args, **kwargs)
+        values = self.bind(args, kwargs)
+        profiler = current_profiler.get()
+        if profiler is not None:
+            render = template.render
+            return profiler.profile(self.f, node_kind(self.top_level), lambda: HTML(render(values)))
+        return HTML(template.render(values))
+
+
+def compile_function(f: Callable[..., Iterator], top_level: Type[Node],
+                     construct: Callable[..., HTML]) -> Callable[..., HTML]:
+    compiler = TemplateCompiler(f, top_level, construct)
+
+    def compiled(*args: Any, **kwargs: Any) -> HTML:
+        return compiler(*args, **kwargs)
+    compiled.compiler = compiler  # type: ignore
+    return compiled
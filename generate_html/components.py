@@ -1,8 +1,9 @@
 from dataclasses import dataclass
 from functools import partial
 from types import TracebackType
-from typing import (Any, Callable, ContextManager, Iterable, Iterator,
-                    Optional, Type)
+from typing import (Any, AsyncContextManager, AsyncIterable, AsyncIterator,
+                    Callable, ContextManager, Iterable, Iterator, Optional,
+                    Type)
 
 from .context import get_stack
 
@@ -21,27 +22,58 @@ class Component(ContextManager, Iterable):
         self.it = f(*args, **kwargs)
 
     def __iter__(self) -> Iterator:
-        stack = get_stack()
+        nodes = get_stack().stack
         for item in self.it:
             if isinstance(item, ComponentContents):
                 yield item.args
             else:
-                stack.add(item)
+                nodes[-1].add(item)
 
     def __enter__(self) -> None:
-        stack = get_stack()
+        nodes = get_stack().stack
         for item in self.it:
             if isinstance(item, ComponentContents):
                 return item.args
-            stack.add(item)
+            nodes[-1].add(item)
         raise InvalidHTML('component does not contain an instance of contents()')
 
     def __exit__(self, exc_type: Optional[Type[BaseException]],
                  exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
-        stack = get_stack()
+        nodes = get_stack().stack
         if exc_type is not None:
             return
         for item in self.it:
             if isinstance(item, ComponentContents):
                 raise InvalidHTML('component invoked as as a context manager, but has multiple instances of contents()')
-            stack.add(item)
+            nodes[-1].add(item)
+
+
+class AsyncComponent(AsyncContextManager, AsyncIterable):
+    def __init__(self, f: Callable[..., AsyncIterator], /, *args: Any, **kwargs: Any):
+        self.it = f(*args, **kwargs)
+
+    async def __aiter__(self) -> AsyncIterator:
+        nodes = get_stack().stack
+        async for item in self.it:
+            if isinstance(item, ComponentContents):
+                yield item.args
+            else:
+                nodes[-1].add(item)
+
+    async def __aenter__(self) -> Any:
+        nodes = get_stack().stack
+        async for item in self.it:
+            if isinstance(item, ComponentContents):
+                return item.args
+            nodes[-1].add(item)
+        raise InvalidHTML('component does not contain an instance of contents()')
+
+    async def __aexit__(self, exc_type: Optional[Type[BaseException]],
+                        exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        nodes = get_stack().stack
+        if exc_type is not None:
+            return
+        async for item in self.it:
+            if isinstance(item, ComponentContents):
+                raise InvalidHTML('component invoked as as a context manager, but has multiple instances of contents()')
+            nodes[-1].add(item)
@@ -3,15 +3,17 @@ from __future__ import annotations
 from contextlib import contextmanager
 from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Iterator, List
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional
 
 if TYPE_CHECKING:
+    from .interning import Interner
     from .nodes import Node
 
 
 @dataclass
 class NodeStack:
     stack: List[Node]
+    interner: Optional[Interner] = None
 
     def push(self, item: Node) -> None:
         self.stack.append(item)
@@ -20,9 +22,16 @@ class NodeStack:
         top = self.stack.pop()
         assert top is item
 
-    def add(self, item: Node) -> None:
+    def add(self, item: Any) -> None:
         self.stack[-1].add(item)
 
+    def close(self, item: Node) -> None:
+        '''Pop ``item`` and add it to the node below it.'''
+        stack = self.stack
+        top = stack.pop()
+        assert top is item
+        stack[-1].add(item)
+
     @contextmanager
     def yield_element(self, item: Node) -> Iterator[Node]:
         self.push(item)
@@ -36,9 +45,8 @@ current_node_stack: ContextVar[NodeStack] = ContextVar('current_node_stack')
 
 
 def get_stack() -> NodeStack:
-    try:
-        return current_node_stack.get()
-    except LookupError:
+    stack = current_node_stack.get(None)
+    if stack is None:
         stack = NodeStack([])
         current_node_stack.set(stack)
-        return stack
+    return stack
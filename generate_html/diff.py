@@ -0,0 +1,401 @@
+'''Computing the changes between two versions of a tree, for partial updates.
+
+:func:`diff` compares an old and a new tree and returns a list of patches
+that turn the HTML of the old one into the HTML of the new one::
+
+    old = dashboard(previous_stats)
+    new = dashboard(stats)
+    send_json([patch.to_dict() for patch in diff(old, new)])
+
+Patches refer to nodes by their path: the indices of the children to
+follow from the root, where the root itself has the path ``()``.
+Fragments are flattened, so children of a fragment count as children of
+the element the fragment was added to. Children are counted the way a
+browser parses the HTML, so on the client side indices refer to
+``childNodes``: adjacent text is one child, empty text is none, comments
+count, and :class:`HTML` strings count as the nodes they contain, which
+are compared as a whole. This assumes that such strings are well-formed
+(every element that is not a void element is closed), and that the tree
+only puts elements where the HTML parser accepts them, so that it does
+not move them around. Patches have to be applied in order, since each
+one refers to the tree as left by the previous ones.
+
+Children with a ``key`` attribute are matched by key, so that inserting,
+removing or reordering rows does not change every row after it. Other
+children are matched by position among the unkeyed children with the
+same tag.
+'''
+import re
+from dataclasses import asdict, dataclass
+from html.parser import HTMLParser
+from typing import (Any, Dict, Hashable, List, Optional, Sequence, Tuple,
+                    Union)
+
+from .html import (ESCAPABLE_RAW_TEXT_ELEMENTS, HTML, RAW_TEXT_ELEMENTS,
+                   VOID_ELEMENTS, convert_identifier, escape, into_html)
+from .nodes import (Child, CommentNode, Element, ElementCollection, LazyNode,
+                    Node, child_html)
+
+__all__ = ['diff', 'apply_patches', 'Replace', 'SetAttribute', 'RemoveAttribute', 'InsertChild', 'RemoveChild',
+           'MoveChild', 'Patch']
+
+Path = Tuple[int, ...]
+
+
+@dataclass
+class Replace:
+    'Replace the node at ``path`` with ``html``.'
+    path: Path
+    html: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'op': 'replace', **asdict(self)}
+
+
+@dataclass
+class SetAttribute:
+    '''Set an attribute of the element at ``path`` to ``value`` (which is
+    not escaped). Boolean attributes have the value ``""``.'''
+    path: Path
+    name: str
+    value: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'op': 'set_attribute', **asdict(self)}
+
+
+@dataclass
+class RemoveAttribute:
+    path: Path
+    name: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'op': 'remove_attribute', **asdict(self)}
+
+
+@dataclass
+class InsertChild:
+    'Insert ``html`` as a child of the node at ``path``, so that it ends up at ``index``.'
+    path: Path
+    index: int
+    html: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'op': 'insert_child', **asdict(self)}
+
+
+@dataclass
+class RemoveChild:
+    path: Path
+    index: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'op': 'remove_child', **asdict(self)}
+
+
+@dataclass
+class MoveChild:
+    '''Move the child at ``from_index`` of the node at ``path``, so that it
+    ends up at ``to_index``.'''
+    path: Path
+    from_index: int
+    to_index: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'op': 'move_child', **asdict(self)}
+
+
+Patch = Union[Replace, SetAttribute, RemoveAttribute, InsertChild, RemoveChild, MoveChild]
+
+
+TEXT_ELEMENTS = RAW_TEXT_ELEMENTS | ESCAPABLE_RAW_TEXT_ELEMENTS
+
+
+class _TopLevelSplitter(HTMLParser):
+    'Find where the top-level nodes of a piece of HTML start.'
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.depth = 0
+        self.starts: List[Tuple[int, int, bool]] = []  # line, column, whether it is text
+        self.in_text = False
+
+    def _node(self, text: bool = False) -> None:
+        if self.depth == 0 and not (text and self.in_text):
+            self.starts.append((*self.getpos(), text))
+        self.in_text = text and self.depth == 0
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        self._node()
+        if tag not in VOID_ELEMENTS:
+            self.depth += 1
+
+    def handle_startendtag(self, tag: str, attrs: Any) -> None:
+        self._node()
+
+    def handle_endtag(self, tag: str) -> None:
+        # an end tag without a start tag is ignored by browsers, so it stays part of the previous node
+        if self.depth:
+            self.depth -= 1
+            self.in_text = False
+
+    def handle_data(self, data: str) -> None:
+        self._node(text=True)
+
+    def handle_entityref(self, name: str) -> None:
+        self._node(text=True)
+
+    def handle_charref(self, name: str) -> None:
+        self._node(text=True)
+
+    def handle_comment(self, data: str) -> None:
+        self._node()
+
+    def handle_decl(self, decl: str) -> None:
+        self._node()
+
+    def handle_pi(self, data: str) -> None:
+        self._node()
+
+    def unknown_decl(self, data: str) -> None:
+        self._node()
+
+
+def _split_html(html: str) -> List[Child]:
+    'Split HTML into the top-level nodes it parses to: text as strings, other nodes as :class:`HTML`.'
+    if not html:
+        return []
+    if '<' not in html:
+        return [html]
+    splitter = _TopLevelSplitter()
+    splitter.feed(html)
+    splitter.close()
+    line_offsets = [0] + [match.end() for match in re.finditer('\n', html)]
+    offsets = [line_offsets[line - 1] + column for line, column, _ in splitter.starts] + [len(html)]
+    offsets[0] = 0  # keeps any stray end tags at the start
+    return [html[start:end] if text else HTML(html[start:end])
+            for (_, _, text), start, end in zip(splitter.starts, offsets, offsets[1:])]
+
+
+def flat_children(node: Node) -> List[Child]:
+    '''The children of a node as a browser would parse them: the children of
+    fragments in their place, adjacent text and :class:`HTML` merged and
+    split into the nodes they contain, and empty text left out.'''
+    if isinstance(node, Element) and node.tagname in TEXT_ELEMENTS:
+        text = ''.join([child_html(child) for child in node.children])
+        return [text] if text else []
+    children: List[Child] = []
+    run: List[str] = []
+    stack = [iter(node.children)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, ElementCollection):
+                stack.append(iter(item.children))
+                break
+            if isinstance(item, Node) and not isinstance(item, LazyNode):
+                if run:
+                    children.extend(_split_html(''.join(run)))
+                    run.clear()
+                children.append(item)
+            else:
+                run.append(child_html(item))
+        else:
+            stack.pop()
+    if run:
+        children.extend(_split_html(''.join(run)))
+    return children
+
+
+def attribute_values(element: Element) -> Dict[str, str]:
+    '''The attributes of an element by their HTML name, as unescaped strings
+    (``""`` for boolean attributes).'''
+    values = {}
+    for key, value in (element._attributes or {}).items():
+        if value is False:
+            continue
+        if value is True:
+            values[convert_identifier(key)] = ''
+        else:
+            if isinstance(value, list):
+                value = ' '.join(str(item) for item in value)
+            values[convert_identifier(key)] = str(value)
+    return values
+
+
+def _kind(item: Child) -> Hashable:
+    if type(item) is Element:
+        return item.tagname
+    if isinstance(item, (CommentNode, LazyNode)) or not isinstance(item, Node):
+        # compared as a whole
+        return None
+    return (type(item), getattr(item, 'tagname', None))
+
+
+def _keys(children: Sequence[Child], key: str) -> List[Hashable]:
+    occurrences: Dict[Hashable, int] = {}
+    keys: List[Hashable] = []
+    for child in children:
+        kind = _kind(child)
+        if isinstance(child, Element) and child._attributes and key in child._attributes:
+            keys.append(('key', kind, str(child._attributes[key])))
+        else:
+            occurrence = occurrences[kind] = occurrences.get(kind, -1) + 1
+            keys.append(('position', kind, occurrence))
+    return keys
+
+
+def _longest_increasing_subsequence(values: Sequence[int]) -> List[int]:
+    'Return the indices of a longest strictly increasing subsequence of ``values``.'
+    tails: List[int] = []
+    previous: List[Optional[int]] = []
+    for index, value in enumerate(values):
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if values[tails[middle]] < value:
+                low = middle + 1
+            else:
+                high = middle
+        previous.append(tails[low - 1] if low else None)
+        if low == len(tails):
+            tails.append(index)
+        else:
+            tails[low] = index
+    result: List[int] = []
+    current = tails[-1] if tails else None
+    while current is not None:
+        result.append(current)
+        current = previous[current]
+    return result[::-1]
+
+
+def _diff_node(old: Child, new: Child, path: Path, key: str, patches: List[Patch]) -> None:
+    if old is new:
+        return
+    kind = _kind(old)
+    if kind is None or kind != _kind(new):
+        new_html = child_html(new)
+        if kind is not None or child_html(old) != new_html:
+            patches.append(Replace(path, new_html))
+        return
+    assert isinstance(old, Node) and isinstance(new, Node)
+    if old.frozen and new.frozen and old.__html__() == new.__html__():
+        return
+    if isinstance(old, Element) and isinstance(new, Element):
+        old_attributes = attribute_values(old)
+        new_attributes = attribute_values(new)
+        for name, value in new_attributes.items():
+            if old_attributes.get(name) != value:
+                patches.append(SetAttribute(path, name, value))
+        for name in old_attributes:
+            if name not in new_attributes:
+                patches.append(RemoveAttribute(path, name))
+    _diff_children(flat_children(old), flat_children(new), path, key, patches)
+
+
+def _diff_children(old_children: List[Child], new_children: List[Child], path: Path, key: str,
+                   patches: List[Patch]) -> None:
+    old_keys = _keys(old_children, key)
+    new_keys = _keys(new_children, key)
+    new_positions = {child_key: index for index, child_key in enumerate(new_keys)}
+    old_by_key = dict(zip(old_keys, old_children))
+    if len(new_positions) < len(new_keys) or len(old_by_key) < len(old_keys):
+        raise ValueError(f'children of the node at {path} have duplicate {key!r} attributes')
+    # remove children that are gone, from the end so indices stay valid
+    for index in reversed(range(len(old_keys))):
+        if old_keys[index] not in new_positions:
+            patches.append(RemoveChild(path, index))
+    current = [child_key for child_key in old_keys if child_key in new_positions]
+    # the kept children in the longest run that is already in the right order stay where they are
+    old_positions = {child_key: index for index, child_key in enumerate(current)}
+    kept = [child_key for child_key in new_keys if child_key in old_positions]
+    stable = {kept[index] for index in _longest_increasing_subsequence([old_positions[k] for k in kept])}
+    # place the other children, from the back, in front of the child that should follow them
+    for new_index in reversed(range(len(new_keys))):
+        child_key = new_keys[new_index]
+        if child_key in stable:
+            continue
+        following = new_keys[new_index + 1] if new_index + 1 < len(new_keys) else None
+        target = current.index(following) if following is not None else len(current)
+        if child_key in old_positions:
+            from_index = current.index(child_key)
+            if from_index < target:
+                target -= 1
+            del current[from_index]
+            if from_index != target:
+                patches.append(MoveChild(path, from_index, target))
+        else:
+            patches.append(InsertChild(path, target, child_html(new_children[new_index])))
+        current.insert(target, child_key)
+    for index, (child_key, child) in enumerate(zip(new_keys, new_children)):
+        if child_key in old_by_key:
+            _diff_node(old_by_key[child_key], child, path + (index,), key, patches)
+
+
+def diff(old: Any, new: Any, *, key: str = 'key') -> List[Patch]:
+    '''Return the patches that turn the HTML of ``old`` into that of ``new``.
+
+    ``key`` is the name of the attribute used to match children.'''
+    old_html = into_html(old)
+    new_html = into_html(new)
+    patches: List[Patch] = []
+    if isinstance(old_html, ElementCollection) and isinstance(new_html, ElementCollection):
+        _diff_children(flat_children(old_html), flat_children(new_html), (), key, patches)
+    else:
+        _diff_node(old_html, new_html, (), key, patches)
+    return patches
+
+
+class _Editable(Node):
+    'A copy of a node that patches can be applied to.'
+    __slots__ = ('original', 'attributes')
+
+    def __init__(self, original: Node) -> None:
+        super().__init__([_editable(child) for child in flat_children(original)])
+        self.original = original
+        self.attributes = attribute_values(original) if isinstance(original, Element) else {}
+
+    def start_html(self) -> str:
+        if isinstance(self.original, Element):
+            attributes = ''.join(f' {name}="{escape(value)}"' for name, value in self.attributes.items())
+            return f'<{self.original.tagname}{attributes}>'
+        return self.original.start_html()
+
+    def end_html(self) -> str:
+        return self.original.end_html()
+
+
+def _editable(item: Child) -> Child:
+    if isinstance(item, Node) and not isinstance(item, (CommentNode, LazyNode)):
+        return _Editable(item)
+    return child_html(item)
+
+
+def apply_patches(root: Any, patches: Sequence[Patch]) -> str:
+    '''Apply patches to (a copy of) a tree and return the resulting HTML.
+
+    This is mainly useful for checking patches, or for keeping a copy of
+    what a client is showing. All attribute values are written out, so
+    compare the result with ``apply_patches(new, [])`` rather than with
+    ``render_html(new)``.'''
+    tree: Child = _editable(into_html(root))
+    for patch in patches:
+        if isinstance(patch, Replace) and not patch.path:
+            tree = patch.html
+            continue
+        parent: Any = tree
+        for index in patch.path[:-1] if isinstance(patch, Replace) else patch.path:
+            parent = parent.children[index]
+        if isinstance(patch, Replace):
+            parent.children[patch.path[-1]] = patch.html
+        elif isinstance(patch, SetAttribute):
+            parent.attributes[patch.name] = patch.value
+        elif isinstance(patch, RemoveAttribute):
+            del parent.attributes[patch.name]
+        elif isinstance(patch, InsertChild):
+            parent.children.insert(patch.index, patch.html)
+        elif isinstance(patch, RemoveChild):
+            del parent.children[patch.index]
+        else:
+            parent.children.insert(patch.to_index, parent.children.pop(patch.from_index))
+    return child_html(tree)
@@ -0,0 +1,188 @@
+'''Keyed caching of page sections, with dependency-based invalidation.
+
+:func:`cached` stores the rendered HTML of a block under a key::
+
+    @document
+    def product_page(product):
+        with tag.main():
+            yield cached(f'product/{product.id}', product_details, product)
+            yield cached('sidebar', sidebar)
+
+    @fragment
+    def product_details(product):
+        yield tag.h1(product.name)
+        yield cached(f'price/{product.id}', price_tag, product.price)
+
+Blocks can be nested: a block depends on the keys of all the cached blocks
+it contains, directly or indirectly, plus any extra keys passed as
+``depends_on``. Invalidating a key with :meth:`FragmentCache.invalidate`
+invalidates every block that depends on it, so after
+``cached.invalidate('price/42')`` the next render rebuilds only the price
+tag and the product details around it, but still reuses the sidebar.
+
+Entries live in a store, which only has to be able to get, set and delete
+strings: :class:`DictStore` keeps them in memory, :class:`SQLiteStore` in a
+file that can be shared by several worker processes.
+'''
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import (TYPE_CHECKING, Any, Callable, Collection, Dict, Optional,
+                    Protocol, Tuple, Union)
+
+from .html import HTML, render_html
+
+if TYPE_CHECKING:
+    import sqlite3
+
+__all__ = ['cached', 'FragmentCache', 'Store', 'DictStore', 'SQLiteStore']
+
+Key = Union[str, Tuple[Any, ...]]
+
+current_dependencies: ContextVar[Optional[Dict[str, str]]] = ContextVar('current_dependencies', default=None)
+
+
+class Store(Protocol):
+    def get(self, key: str) -> Optional[str]: ...
+    def set(self, key: str, value: str) -> None: ...
+    def delete(self, key: str) -> None: ...
+
+
+class DictStore:
+    '''Keeps entries in memory, in this process only.
+
+    At most ``maxsize`` blocks are kept (``None`` for no limit); the least
+    recently used ones are discarded first. Versions of invalidated keys
+    are always kept, since forgetting one could make blocks that depend
+    on it valid again. Use :class:`SQLiteStore` to share entries between
+    processes.'''
+    def __init__(self, maxsize: Optional[int] = 10000) -> None:
+        self.maxsize = maxsize
+        self.entries: 'OrderedDict[str, str]' = OrderedDict()
+        self.versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key.startswith('version:'):
+                return self.versions.get(key)
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            if key.startswith('version:'):
+                self.versions[key] = value
+                return
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if self.maxsize is not None and len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self.entries.pop(key, None)
+            self.versions.pop(key, None)
+
+
+class SQLiteStore:
+    '''Keeps entries in an SQLite database file.
+
+    Every thread and process opens its own connection, so the same file
+    can be used by all workers of a server on one machine.'''
+    def __init__(self, path: Union[str, 'os.PathLike[str]'], timeout: float = 5.0) -> None:
+        self.path = os.fspath(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self.connection.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    @property
+    def connection(self) -> 'sqlite3.Connection':
+        # connections must not be shared with a forked child process
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if connection is None or pid != os.getpid():
+            # imported here, so importing the package is fast and works on Pythons built without sqlite3
+            import sqlite3
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = os.getpid(), connection
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.connection.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: str) -> None:
+        self.connection.execute('INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)', (key, value))
+
+    def delete(self, key: str) -> None:
+        self.connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+
+def _key_string(key: Key) -> str:
+    # JSON keeps 'a/b', ('a/b',) and ('a', 'b') apart
+    return json.dumps(key, ensure_ascii=False, separators=(',', ':'))
+
+
+class FragmentCache:
+    '''Caches rendered blocks in ``store``, see :mod:`generate_html.fragment_cache`.
+
+    The default instance is available as :func:`cached`; create another one
+    to use a different store::
+
+        cached = FragmentCache(SQLiteStore('/var/cache/myapp/fragments.sqlite'))
+    '''
+    def __init__(self, store: Store) -> None:
+        self.store = store
+
+    def version(self, key: str) -> str:
+        return self.store.get('version:' + key) or ''
+
+    def __call__(self, key: Key, f: Callable[..., Any], *args: Any, depends_on: Collection[Key] = ()) -> HTML:
+        '''Return the HTML stored under ``key``, or ``f(*args)`` rendered
+        (and stored) if there is no valid entry.
+
+        ``key`` is a string or a tuple of strings and numbers. ``f`` is
+        usually a :func:`fragment`, and should return the same HTML for as
+        long as none of the keys it depends on are invalidated.'''
+        key = _key_string(key)
+        entry = self.store.get('html:' + key)
+        if entry is not None:
+            html, dependencies = json.loads(entry)
+            if all(self.version(dependency) == version for dependency, version in dependencies.items()):
+                self._record(dependencies)
+                return HTML(html)
+        dependencies = {key: self.version(key)}
+        for extra in depends_on:
+            extra = _key_string(extra)
+            dependencies[extra] = self.version(extra)
+        token = current_dependencies.set(dependencies)
+        try:
+            html = render_html(f(*args))
+        finally:
+            current_dependencies.reset(token)
+        self.store.set('html:' + key, json.dumps([html, dependencies]))
+        self._record(dependencies)
+        return HTML(html)
+
+    def _record(self, dependencies: Dict[str, str]) -> None:
+        outer = current_dependencies.get()
+        if outer is not None:
+            outer.update(dependencies)
+
+    def invalidate(self, key: Key) -> None:
+        '''Invalidate the block stored under ``key`` and every block that
+        depends on it.
+
+        This also works for keys that are only used in ``depends_on``.'''
+        key = _key_string(key)
+        self.store.set('version:' + key, os.urandom(8).hex())
+        self.store.delete('html:' + key)
+
+
+cached = FragmentCache(DictStore())
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from html import escape as html_escape
-from typing import Any
+from typing import Any, Callable, Dict, Optional
 
 VOID_ELEMENTS = frozenset({'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr'})
 RAW_TEXT_ELEMENTS = frozenset({'script', 'style'})
@@ -17,6 +18,8 @@ class HTML:
 
     Use :func:`render_html` to get the HTML as a string.
     '''
+    __slots__ = ('value',)
+
     def __init__(self, value: Any) -> None:
         self.value = str(value)
 
@@ -27,15 +30,43 @@ class HTML:
         return self.value
 
 
+NO_ESCAPE_TYPES = frozenset({int, float, bool})
+ESCAPE_CACHE_MAX_LENGTH = 64
+
+
+_escape_short_str: Callable[[str], str] = lru_cache(maxsize=1024)(html_escape)
+
+
+def set_escape_cache_size(maxsize: int) -> None:
+    '''Set the number of short strings whose escaped form is remembered.
+
+    Only strings that actually need escaping and are at most
+    ``ESCAPE_CACHE_MAX_LENGTH`` characters long are cached. Use ``0``
+    to disable the cache.'''
+    global _escape_short_str
+    _escape_short_str = lru_cache(maxsize=maxsize)(html_escape) if maxsize else html_escape
+
+
 def escape(thing: Any) -> str:
     '''Convert to string and escape special characters.
 
     This function is called automatically where relevant, you usually
     do not need to call this yourself.'''
-    return html_escape(str(thing))
-
-
-def render_html(thing: Any) -> str:
+    cls = type(thing)
+    if cls is str:
+        value = thing
+    elif cls in NO_ESCAPE_TYPES:
+        return str(thing)
+    else:
+        value = str(thing)
+    if '&' in value or '<' in value or '>' in value or '"' in value or "'" in value:
+        if len(value) <= ESCAPE_CACHE_MAX_LENGTH:
+            return _escape_short_str(value)
+        return html_escape(value)
+    return value
+
+
+def render_html(thing: Any, *, minify: bool = False) -> str:
     '''Render something as an HTML string, escaping special characters if necessary
 
     ::
@@ -43,7 +74,13 @@ def render_html(thing: Any) -> str:
         render_html(HTML('<img>')) == '<img>'
         render_html(42) == '42'
         render_html('<img>') == '&lt;img&gt;'
+
+    With ``minify=True``, optional end tags and attribute quotes are left
+    out, see :mod:`generate_html.minify`.
     '''
+    if minify:
+        from .minify import render_minified  # imports this module
+        return render_minified(thing)
     return into_html(thing).__html__()
 
 
@@ -61,5 +98,22 @@ def into_html(thing: Any) -> HTML:
     return HTML(escape(thing))
 
 
+@lru_cache(maxsize=1024)
 def convert_identifier(key: str) -> str:
     return key.rstrip('_').replace('_', '-')
+
+
+def serialize_attribute(key: str, value: Any) -> str:
+    if value is False:
+        return ''
+    if value is True:
+        return ' ' + convert_identifier(key)
+    if isinstance(value, list):
+        value = ' '.join(str(item) for item in value)
+    return f' {convert_identifier(key)}="{escape(value)}"'
+
+
+def serialize_start_tag(tagname: str, attributes: Optional[Dict[str, Any]]) -> str:
+    if not attributes:
+        return f'<{tagname}>'
+    return ''.join(['<', tagname, *(serialize_attribute(key, value) for key, value in attributes.items()), '>'])
@@ -1,13 +1,21 @@
 from functools import partial, update_wrapper
-from typing import Any, Callable, Dict, Iterable, Iterator, Type, TypeVar
+from inspect import isasyncgenfunction, unwrap
+from typing import (Any, AsyncIterator, Callable, Coroutine, Dict, Iterable,
+                    Iterator, List, Mapping, Optional, Protocol, Sequence,
+                    Tuple, Type, TypeVar, Union, cast, overload)
+from weakref import WeakKeyDictionary
 
-from .components import Component, ComponentContents
-from .context import get_stack
-from .html import HTML, RAW_TEXT_ELEMENTS, convert_identifier, into_html
+from .caching import (LRU, cache_async_node_function, cache_component_function,
+                      cache_node_function)
+from .compiler import TemplateCompiler, compile_function, tracing
+from .components import AsyncComponent, Component, ComponentContents
+from .context import NodeStack, current_node_stack, get_stack
+from .html import HTML, RAW_TEXT_ELEMENTS, convert_identifier
 from .nodes import (CommentNode, DocumentElement, Element, ElementCollection,
-                    Node)
+                    LazyNode, Node, into_child, raw_text)
+from .profiling import current_profiler, node_kind
 
-__all__ = ['tag', 'comment', 'contents', 'document', 'fragment', 'component']
+__all__ = ['tag', 'comment', 'lazy', 'contents', 'document', 'fragment', 'component', 'table_rows']
 
 
 def create_element(tagname: str, children: Iterable, attributes: Dict[str, Any]) -> Element:
@@ -29,9 +37,9 @@ def create_element(tagname: str, children: Iterable, attributes: Dict[str, Any])
         create_element('import', [], {'class': 'test', 'data-accept': 'y'})
     '''
     if tagname in RAW_TEXT_ELEMENTS:
-        children_fix = [child if isinstance(child, HTML) else HTML(child) for child in children]
+        children_fix = [raw_text(child) for child in children]
     else:
-        children_fix = [into_html(child) for child in children]
+        children_fix = [into_child(child) for child in children]
     return Element(children_fix, tagname, attributes)
 
 
@@ -41,8 +49,13 @@ class TagHelper:
         return create_element(tagname, children, attributes)
 
     def __getattr__(self, key: str) -> Callable[..., Element]:
+        helper = partial(self, convert_identifier(key))
+        # only called for missing attributes, so this makes later lookups of the same tag plain attribute access
+        setattr(self, key, helper)
+        return helper
+
+    def __getitem__(self, key: str) -> Callable[..., Element]:
         return partial(self, convert_identifier(key))
-    __getitem__ = __getattr__
 
 
 tag = TagHelper()
@@ -50,7 +63,23 @@ tag = TagHelper()
 
 def comment(*args: Any) -> CommentNode:
     '''Create an HTML comment'''
-    return CommentNode([into_html(piece) for piece in args])
+    return CommentNode([into_child(piece) for piece in args])
+
+
+def lazy(source: Any) -> LazyNode:
+    '''Insert children that are only produced when the HTML is serialized.
+
+    ``source`` can be any iterable, such as a generator or a database
+    cursor, or a function without arguments that returns an iterable (or a
+    single child)::
+
+        yield tag.table(lazy(tag.tr(tag.td(name), tag.td(price)) for name, price in cursor))
+
+    The children are converted and escaped one by one while serializing,
+    so with :func:`iter_html` or :func:`render_to` only one row needs to be
+    in memory at a time. A generator can only be consumed once, so such a
+    tree can only be rendered once.'''
+    return LazyNode(source)
 
 
 def contents(*args: Any) -> ComponentContents:
@@ -61,35 +90,283 @@ def contents(*args: Any) -> ComponentContents:
 
 
 def _construct_node(f: Callable[..., Iterator], top_level: Type[Node], /, *args: Any, **kwargs: Any) -> HTML:
+    profiler = current_profiler.get()
+    if profiler is not None:
+        # while a compiled function is traced, its arguments are placeholders that cannot be serialized
+        if tracing.get():
+            profiler = None
+        else:
+            started = profiler.start()
     stack = get_stack()
-    with stack.yield_element(top_level([])) as top_el:
-        for thing in f(*args, **kwargs):
-            stack.add(thing)
+    # bound once, so each yielded item costs a single method call on the innermost open node
+    nodes = stack.stack
+    result = None
+    try:
+        with stack.yield_element(top_level([])) as top_el:
+            for thing in f(*args, **kwargs):
+                nodes[-1].add(thing)
+        if stack.interner is not None:
+            stack.interner.intern_children(top_el)
+        result = top_el
+    finally:
+        if profiler is not None:
+            profiler.stop(f, node_kind(top_level), result, started)
+    return top_el
+
+
+async def _construct_node_async(f: Callable[..., AsyncIterator], top_level: Type[Node], /,
+                                *args: Any, **kwargs: Any) -> HTML:
+    profiler = current_profiler.get()
+    if profiler is not None:
+        return await profiler.profile_async(f, node_kind(top_level), _build_node_async(f, top_level, args, kwargs))
+    return await _build_node_async(f, top_level, args, kwargs)
+
+
+async def _build_node_async(f: Callable[..., AsyncIterator], top_level: Type[Node], args: Tuple[Any, ...],
+                            kwargs: Dict[str, Any]) -> HTML:
+    # Tasks copy the context of whoever created them, so they could end up sharing a stack.
+    # Giving each construction its own stack keeps concurrent tasks from interfering.
+    outer = current_node_stack.get(None)
+    stack = NodeStack([], outer.interner if outer is not None else None)
+    token = current_node_stack.set(stack)
+    try:
+        with stack.yield_element(top_level([])) as top_el:
+            async for thing in f(*args, **kwargs):
+                stack.add(thing)
+    finally:
+        current_node_stack.reset(token)
+    if stack.interner is not None:
+        stack.interner.intern_children(top_el)
     return top_el
 
 
-T = TypeVar('T', HTML, Component)
+T = TypeVar('T', HTML, Component, AsyncComponent)
 
 
-def _signature_fix(decorated: Callable, original: Callable[..., Iterator],
+def _signature_fix(decorated: Callable, original: Callable[..., Any],
                    return_annotation: Type[T]) -> Callable[..., T]:
     update_wrapper(decorated, original)
     decorated.__annotations__['return'] = return_annotation
     return decorated
 
 
-def document(f: Callable[..., Iterator]) -> Callable[..., HTML]:
+NodeFunction = Callable[..., Union[Iterator, AsyncIterator]]
+AsyncNodeFunction = Callable[..., Coroutine[Any, Any, HTML]]
+
+
+class NodeDecorator(Protocol):
+    'The type of ``@document(...)`` and ``@fragment(...)``.'
+    @overload
+    def __call__(self, f: Callable[..., Iterator], /) -> Callable[..., HTML]: ...
+    @overload
+    def __call__(self, f: Callable[..., AsyncIterator], /) -> AsyncNodeFunction: ...
+
+
+def _node_function(f: NodeFunction, top_level: Type[Node], compiled: bool,
+                   cache: Optional[LRU]) -> Callable[..., Any]:
+    construct: Callable[..., Any]
+    if isasyncgenfunction(f):
+        if compiled:
+            raise TypeError('async generator functions cannot be compiled')
+
+        async def construct_async(*args: Any, **kwargs: Any) -> HTML:
+            return await _construct_node_async(f, top_level, *args, **kwargs)
+        construct = construct_async if cache is None else cache_async_node_function(construct_async, cache)
+    else:
+        sync_f = cast(Callable[..., Iterator], f)
+        if compiled:
+            construct = compile_function(sync_f, top_level, _construct_node)
+        else:
+            construct = lambda *args, **kwargs: _construct_node(sync_f, top_level, *args, **kwargs)  # noqa: E731
+        if cache is not None:
+            construct = cache_node_function(construct, cache)
+    return _with_cache(_signature_fix(construct, f, HTML), cache)
+
+
+def _with_cache(decorated: Callable[..., T], cache: Optional[LRU]) -> Callable[..., T]:
+    if cache is not None:
+        decorated.cache = cache  # type: ignore
+    return decorated
+
+
+@overload
+def document(f: Callable[..., Iterator], /) -> Callable[..., HTML]: ...
+@overload
+def document(f: Callable[..., AsyncIterator], /) -> AsyncNodeFunction: ...
+@overload
+def document(*, compiled: bool = False, cache: Optional[LRU] = None) -> NodeDecorator: ...
+
+
+def document(f: Optional[NodeFunction] = None, /, *, compiled: bool = False, cache: Optional[LRU] = None
+             ) -> Union[Callable[..., Any], NodeDecorator]:
     """Decorator for full HTML documents.
 
-    Converts a function that returns an interator. :func:`generate_html.into_html` is used """
-    return _signature_fix(lambda *args, **kwargs: _construct_node(f, DocumentElement, *args, **kwargs), f, HTML)
+    Converts a function that returns an interator. :func:`generate_html.into_html` is used
+
+    If the decorated function is an async generator function, the result is
+    a coroutine function instead.
+
+    Use ``@document(compiled=True)`` to compile the document into a template
+    on its first call, see :mod:`generate_html.compiler`. Pass an
+    :class:`~generate_html.caching.LRU` as ``cache`` to reuse the result of
+    earlier calls with the same arguments."""
+    if f is None:
+        return cast(NodeDecorator, partial(_node_function, top_level=DocumentElement, compiled=compiled, cache=cache))
+    return _node_function(f, DocumentElement, compiled, cache)
+
 
+@overload
+def fragment(f: Callable[..., Iterator], /) -> Callable[..., HTML]: ...
+@overload
+def fragment(f: Callable[..., AsyncIterator], /) -> AsyncNodeFunction: ...
+@overload
+def fragment(*, compiled: bool = False, cache: Optional[LRU] = None) -> NodeDecorator: ...
 
-def fragment(f: Callable[..., Iterator]) -> Callable[..., HTML]:
-    """Decorator for HTML fragments"""
-    return _signature_fix(lambda *args, **kwargs: _construct_node(f, ElementCollection, *args, **kwargs), f, HTML)
 
+def fragment(f: Optional[NodeFunction] = None, /, *, compiled: bool = False, cache: Optional[LRU] = None
+             ) -> Union[Callable[..., Any], NodeDecorator]:
+    """Decorator for HTML fragments
+
+    If the decorated function is an async generator function, the result is
+    a coroutine function instead.
+
+    Use ``@fragment(compiled=True)`` to compile the fragment into a template
+    on its first call, see :mod:`generate_html.compiler`. Pass an
+    :class:`~generate_html.caching.LRU` as ``cache`` to reuse the result of
+    earlier calls with the same arguments."""
+    if f is None:
+        return cast(NodeDecorator, partial(_node_function, top_level=ElementCollection, compiled=compiled, cache=cache))
+    return _node_function(f, ElementCollection, compiled, cache)
+
+
+def _new_component(f: Callable[..., Iterator], /, *args: Any, **kwargs: Any) -> Component:
+    profiler = current_profiler.get()
+    if profiler is not None and not tracing.get():
+        return Component(profiler.profile_component, f, args, kwargs)
+    return Component(f, *args, **kwargs)
+
+
+ComponentFunction = Callable[..., Union[Component, AsyncComponent]]
+
+
+class ComponentDecorator(Protocol):
+    'The type of ``@component(...)``.'
+    @overload
+    def __call__(self, f: Callable[..., Iterator], /) -> Callable[..., Component]: ...
+    @overload
+    def __call__(self, f: Callable[..., AsyncIterator], /) -> Callable[..., AsyncComponent]: ...
+
+
+def _component_function(f: Callable[..., Union[Iterator, AsyncIterator]], cache: Optional[LRU]) -> ComponentFunction:
+    if isasyncgenfunction(f):
+        if cache is not None:
+            raise TypeError('async components cannot be cached')
+        return _signature_fix(lambda *args, **kwargs: AsyncComponent(f, *args, **kwargs), f, AsyncComponent)
+    sync_f = cast(Callable[..., Iterator], f)
+    if cache is not None:
+        return _with_cache(_signature_fix(cache_component_function(sync_f, cache), f, Component), cache)
+    return _signature_fix(lambda *args, **kwargs: _new_component(sync_f, *args, **kwargs), f, Component)
+
+
+@overload
+def component(f: Callable[..., Iterator], /) -> Callable[..., Component]: ...
+@overload
+def component(f: Callable[..., AsyncIterator], /) -> Callable[..., AsyncComponent]: ...
+@overload
+def component(*, cache: Optional[LRU] = None) -> ComponentDecorator: ...
+
+
+def component(f: Optional[Callable[..., Union[Iterator, AsyncIterator]]] = None, /, *, cache: Optional[LRU] = None
+              ) -> Union[ComponentFunction, ComponentDecorator]:
+    """Decorator for components
+
+    Components made from async generator functions are used with
+    ``async with`` and ``async for`` instead.
+
+    Pass an :class:`~generate_html.caching.LRU` as ``cache`` to reuse the
+    HTML a component generates around its :func:`contents` for calls with
+    the same arguments."""
+    if f is None:
+        return cast(ComponentDecorator, partial(_component_function, cache=cache))
+    return _component_function(f, cache)
+
+
+_row_compilers: 'WeakKeyDictionary[Callable, TemplateCompiler]' = WeakKeyDictionary()
+
+
+def table_rows(row: Callable[..., Union[Iterator, HTML]], records: Optional[Iterable[Any]] = None, *,
+               columns: Union[Sequence[Iterable], Mapping[str, Iterable], None] = None) -> HTML:
+    '''Render ``row`` for many records at once.
+
+    ``row`` is a generator function like those decorated with
+    :func:`fragment` (decorating it is optional). It is compiled into a
+    template once (see :mod:`generate_html.compiler`), after which each
+    record only costs escaping its values and joining strings::
+
+        def product_row(name, price):
+            with tag.tr():
+                yield tag.td(name)
+                yield tag.td(price, class_='price')
+
+        with tag.tbody():
+            yield table_rows(product_row, [('Widget', 3), ('Gadget', 5)])
+            yield table_rows(product_row, columns={'name': names, 'price': prices})
+
+    Records are sequences of positional arguments or mappings of keyword
+    arguments. Alternatively, ``columns`` gives the arguments column by
+    column, either positionally or by name; any iterable (such as an array)
+    works as a column.
+
+    Like :func:`lazy`, the rows are only rendered when the result is
+    serialized, one at a time, so with :func:`iter_html` or
+    :func:`render_to` they go straight to the output. Records that can only
+    be iterated over once can only be rendered once.
+    '''
+    if (records is None) == (columns is None):
+        raise TypeError('table_rows() needs either records or columns')
+    compiler = getattr(row, 'compiler', None)
+    if not isinstance(compiler, TemplateCompiler):
+        f = unwrap(row)
+        if isasyncgenfunction(f):
+            raise TypeError('async generator functions cannot be used as a row template')
+        compiler = _row_compilers.get(f)
+        if compiler is None:
+            compiler = _row_compilers[f] = TemplateCompiler(f, ElementCollection, _construct_node)
+    template = compiler.get_template()
 
-def component(f: Callable[..., Iterator]) -> Callable[..., Component]:
-    """Decorator for components"""
-    return _signature_fix(lambda *args, **kwargs: Component(f, *args, **kwargs), f, Component)
+    def rows() -> Iterator[str]:
+        # the names of the values at the end of each record that are passed by keyword
+        keyword_names: List[str] = []
+        records_iter: Iterable[Any]
+        if columns is None:
+            assert records is not None
+            records_iter = records
+        elif isinstance(columns, Mapping):
+            if columns.keys() >= set(compiler.names):
+                records_iter = zip(*(columns[name] for name in compiler.names))
+                keyword_names = compiler.names[compiler.positional_count:]
+            else:
+                names = list(columns)
+                records_iter = (dict(zip(names, values)) for values in zip(*columns.values()))
+        else:
+            records_iter = zip(*columns)
+        for record in records_iter:
+            args: Sequence[Any]
+            kwargs: Dict[str, Any] = {}
+            if keyword_names:
+                split = len(record) - len(keyword_names)
+                args = record[:split]
+                kwargs = dict(zip(keyword_names, record[split:]))
+            elif type(record) is tuple:
+                args = record
+            elif isinstance(record, Mapping):
+                args = ()
+                kwargs = dict(record)
+            else:
+                args = tuple(record)
+            if template is None:
+                yield compiler.construct(compiler.f, ElementCollection, *args, **kwargs).__html__()
+            else:
+                yield template.render(compiler.bind(tuple(args), kwargs))
+    # the rows are already HTML, so they are passed on without escaping
+    return LazyNode(rows, raw=True)
@@ -0,0 +1,95 @@
+'''Sharing one node between all identical subtrees.
+
+Pages often repeat the same small subtrees: icons, empty cells, badges.
+While interning is active, every fragment or document that is constructed
+replaces the subtrees in its result by a canonical node with the same
+structure, so each distinct subtree exists only once::
+
+    with interning() as interner:
+        html = render_html(catalog_page(products))
+
+A canonical node is frozen the first time it is reused, so it is also
+serialized only once. Nodes must not be changed after they have been
+interned, since they can be part of many trees.
+
+Only elements and comments with text, plain :class:`HTML` and interned
+children are interned; anything else is left as it is. The interner
+keeps every canonical node alive until it is discarded, so use it for a
+limited time, such as a single request.
+'''
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterator, Optional, Set
+
+from .context import get_stack
+from .html import HTML
+from .nodes import CommentNode, Element, ElementCollection, Node
+
+__all__ = ['Interner', 'interning']
+
+
+class Interner:
+    def __init__(self) -> None:
+        self.nodes: Dict[Hashable, Node] = {}
+        self.texts: Dict[str, str] = {}
+        # ids of canonical nodes and texts, which stay valid since they are kept alive by the dicts above
+        self.canonical: Set[int] = set()
+        self.hits = 0
+
+    def intern(self, item: Any) -> Any:
+        'Return the canonical version of ``item``, interning its children first.'
+        cls = item.__class__
+        if cls is HTML:
+            # renders the same as a child, so it is stored as text
+            item = item.value
+            cls = str
+        if cls is str:
+            text = self.texts.get(item)
+            if text is None:
+                text = self.texts[item] = item
+                self.canonical.add(id(item))
+            return text
+        if id(item) in self.canonical:
+            return item
+        if cls is Element or cls is CommentNode:
+            item.children = [self.intern(child) for child in item.children]
+            key = self.key(item)
+            if key is None:
+                return item
+            canonical = self.nodes.get(key)
+            if canonical is None:
+                self.nodes[key] = item
+                self.canonical.add(id(item))
+                return item
+            if not canonical.frozen:
+                canonical.freeze()
+            self.hits += 1
+            return canonical
+        if isinstance(item, ElementCollection) and not item.frozen:
+            item.children = [self.intern(child) for child in item.children]
+        return item
+
+    def key(self, node: Node) -> Optional[Hashable]:
+        'The HTML of a node whose children are interned, or ``None`` if it cannot be interned.'
+        canonical = self.canonical
+        if not all(id(child) in canonical for child in node.children):
+            return None
+        # keyed on the HTML of the start tag, so values that compare equal but render differently,
+        # such as True and 1, are kept apart
+        return node.__class__, node.start_html(), tuple(map(id, node.children))
+
+    def intern_children(self, node: Node) -> None:
+        node.children = [self.intern(child) for child in node.children]
+
+
+@contextmanager
+def interning(interner: Optional[Interner] = None) -> Iterator[Interner]:
+    '''Intern the results of fragments and documents constructed in this block.
+
+    Pass an existing ``interner`` to share canonical nodes between blocks.'''
+    stack = get_stack()
+    previous = stack.interner
+    stack.interner = interner if interner is not None else Interner()
+    try:
+        yield stack.interner
+    finally:
+        stack.interner = previous
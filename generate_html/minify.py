@@ -0,0 +1,188 @@
+'''A serializer that leaves out everything the HTML parser does not need.
+
+It omits end tags the HTML standard allows to be omitted (see
+https://html.spec.whatwg.org/multipage/syntax.html#optional-tags), writes
+empty attribute values as just the attribute name and leaves out quotes
+around attribute values that do not need them. Text is never changed,
+so the contents of ``<script>``, ``<style>``, ``<textarea>`` and
+``<title>`` (and whitespace in ``<pre>``) are unaffected.
+
+End tags are only omitted when it is known what follows them. If the root
+of what is being rendered is a fragment rather than an element, the
+surroundings it will end up in are unknown, so end tags at its top level
+are only omitted when followed by a suitable sibling.
+
+HTML that is already rendered, such as the output of compiled templates
+or :func:`cached` blocks, is included as-is. Frozen nodes are walked again.
+'''
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from .html import (ESCAPABLE_RAW_TEXT_ELEMENTS, RAW_TEXT_ELEMENTS,
+                   VOID_ELEMENTS, convert_identifier, escape, into_html)
+from .nodes import (Child, CommentNode, DocumentElement, Element,
+                    ElementCollection, LazyNode, Node, child_html)
+
+__all__ = ['generate_minified_html', 'render_minified']
+
+# the end tag of the key may be omitted if it is immediately followed by one of these elements
+OMIT_BEFORE = {
+    'li': {'li'},
+    'dt': {'dt', 'dd'},
+    'dd': {'dd', 'dt'},
+    'rt': {'rt', 'rp'},
+    'rp': {'rt', 'rp'},
+    'optgroup': {'optgroup', 'hr'},
+    'option': {'option', 'optgroup', 'hr'},
+    'thead': {'tbody', 'tfoot'},
+    'tbody': {'tbody', 'tfoot'},
+    'tfoot': set(),
+    'tr': {'tr'},
+    'td': {'td', 'th'},
+    'th': {'td', 'th'},
+    'p': {'address', 'article', 'aside', 'blockquote', 'details', 'dialog', 'div', 'dl', 'fieldset', 'figcaption',
+          'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu',
+          'nav', 'ol', 'p', 'pre', 'search', 'section', 'table', 'ul'},
+}
+# the end tag of these may also be omitted if there is no more content in the parent element
+OMIT_AT_END = {'li', 'dd', 'rt', 'rp', 'optgroup', 'option', 'tbody', 'tfoot', 'tr', 'td', 'th', 'p'}
+# ... except for p elements in these
+P_KEEP_END_IN = {'a', 'audio', 'del', 'ins', 'map', 'noscript', 'video'}
+
+TEXT_ELEMENTS = RAW_TEXT_ELEMENTS | ESCAPABLE_RAW_TEXT_ELEMENTS
+
+UNQUOTED_UNSAFE = re.compile('[\t\n\f\r "\'=<>`]')
+
+_END = object()
+
+
+def minify_start_tag(tagname: str, attributes: Optional[Dict[str, Any]]) -> str:
+    parts = ['<', tagname]
+    for key, value in (attributes or {}).items():
+        if value is False:
+            continue
+        name = convert_identifier(key)
+        if value is True:
+            parts.append(' ' + name)
+            continue
+        if isinstance(value, list):
+            value = ' '.join(str(item) for item in value)
+        text = escape(value)
+        if not text:
+            parts.append(' ' + name)
+        elif UNQUOTED_UNSAFE.search(text):
+            parts.append(f' {name}="{text}"')
+        else:
+            parts.append(f' {name}={text}')
+    parts.append('>')
+    return ''.join(parts)
+
+
+def _content(node: Node) -> Iterator[Child]:
+    'Yield the children of a node, looking through fragments and lazy nodes and skipping empty HTML.'
+    stack = [iter(node.children)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, (ElementCollection, LazyNode)):
+                stack.append(iter(item.children))
+                break
+            if not isinstance(item, Node) and not child_html(item):
+                continue
+            yield item
+        else:
+            stack.pop()
+
+
+class _Frame:
+    __slots__ = ('node', 'items', 'peeked')
+
+    def __init__(self, node: Node) -> None:
+        self.node = node
+        self.items = _content(node)
+        self.peeked: Any = None
+
+    def next(self) -> Any:
+        if self.peeked is not None:
+            item, self.peeked = self.peeked, None
+            return item
+        return next(self.items, _END)
+
+    def peek(self) -> Any:
+        if self.peeked is None:
+            self.peeked = next(self.items, _END)
+        return self.peeked
+
+
+def _is_element(item: Any, tagnames: Any) -> bool:
+    return isinstance(item, Element) and not isinstance(item, DocumentElement) and item.tagname in tagnames
+
+
+def can_omit_end_tag(tagname: str, following: Any, parent: Optional[Node]) -> bool:
+    '''Whether the end tag of a ``tagname`` element can be left out.
+
+    ``following`` is the next sibling, or ``_END`` if there is none, and
+    ``parent`` the parent node, or ``None`` if it is unknown.'''
+    if tagname in ('html', 'body'):
+        if following is _END:
+            return parent is not None
+        return not isinstance(following, CommentNode)
+    if tagname == 'head':
+        return isinstance(following, Element)
+    if following is _END:
+        if parent is None or tagname not in OMIT_AT_END:
+            return False
+        if tagname == 'p' and isinstance(parent, Element):
+            return parent.tagname not in P_KEEP_END_IN and '-' not in parent.tagname
+        return True
+    return tagname in OMIT_BEFORE and _is_element(following, OMIT_BEFORE[tagname])
+
+
+def _start_html(node: Node) -> str:
+    if isinstance(node, Element):
+        return minify_start_tag(node.tagname, node._attributes)
+    return node.start_html()
+
+
+def generate_minified_html(root: Node) -> Iterator[str]:
+    '''Yield the minified HTML of a tree in pieces.'''
+    if isinstance(root, CommentNode) or isinstance(root, Element) and root.tagname in TEXT_ELEMENTS:
+        yield _start_html(root) if isinstance(root, Element) else root.start_html()
+        yield ''.join([child_html(child) for child in root.children])
+        yield root.end_html()
+        return
+    yield _start_html(root)
+    stack: List[_Frame] = [_Frame(root)]
+    # the parent of the root is unknown, unless the root is a whole document
+    known_root = isinstance(root, Element)
+    while stack:
+        frame = stack[-1]
+        item = frame.next()
+        if item is _END:
+            stack.pop()
+            node = frame.node
+            end = node.end_html()
+            if end and isinstance(node, Element) and stack:
+                parent = stack[-1].node if len(stack) > 1 or known_root else None
+                if can_omit_end_tag(node.tagname, stack[-1].peek(), parent):
+                    continue
+            if end:
+                yield end
+        elif isinstance(item, CommentNode):
+            yield item.__html__()
+        elif isinstance(item, Node):
+            yield _start_html(item)
+            if isinstance(item, Element) and item.tagname in TEXT_ELEMENTS:
+                # their contents are text to the parser, even if they were given as elements
+                yield ''.join([child_html(child) for child in item.children])
+                yield item.end_html()
+            elif not (isinstance(item, Element) and item.tagname in VOID_ELEMENTS):
+                stack.append(_Frame(item))
+        else:
+            yield child_html(item)
+
+
+def render_minified(thing: Any) -> str:
+    html = into_html(thing)
+    if isinstance(html, Node):
+        return ''.join(generate_minified_html(html))
+    return html.__html__()
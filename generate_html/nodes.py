@@ -1,34 +1,124 @@
-from dataclasses import dataclass
 from types import TracebackType
-from typing import (Any, Callable, ContextManager, Dict, Iterable, Iterator,
-                    List, Optional, Type)
+from typing import Any, Dict, Iterator, List, Optional, Type, Union
 
 from .components import Component
 from .context import get_stack
-from .html import (HTML, RAW_TEXT_ELEMENTS, VOID_ELEMENTS, convert_identifier,
-                   escape, into_html, render_html)
+from .html import (HTML, RAW_TEXT_ELEMENTS, VOID_ELEMENTS, escape,
+                   serialize_start_tag)
 
+SPECIAL_CONTENT_ELEMENTS = VOID_ELEMENTS | RAW_TEXT_ELEMENTS
 
-@dataclass
-class Node(HTML, ContextManager):
-    children: List[HTML]
+# text is stored in the children of nodes as an escaped str, rather than wrapped in an HTML object
+Child = Union[HTML, str]
+
+
+def into_child(thing: Any) -> Child:
+    '''Convert an object to a child of a node, escaping special characters if necessary.'''
+    if isinstance(thing, HTML):
+        return thing
+    return escape(thing)
+
+
+def child_html(child: Child) -> str:
+    '''The HTML of a child of a node.'''
+    if child.__class__ is str:
+        return child  # type: ignore
+    return child.__html__()  # type: ignore
+
+
+class Node(HTML):
+    '''A node with children, which are :class:`HTML` objects or strings of
+    already escaped text. Use :func:`child_html` to get the HTML of a child.'''
+    __slots__ = ('children', '_frozen_html')
+
+    def __init__(self, children: List[Child]) -> None:
+        self.children = children
+        self._frozen_html: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f'{type(self).__qualname__}(children={self.children!r})'
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is self.__class__:
+            assert isinstance(other, Node)
+            return self.children == other.children
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def freeze(self) -> 'Node':
+        '''Cache the rendered HTML of this node.
+
+        Rendering a frozen node (or a tree containing it) reuses the cached
+        string instead of walking its children again, which makes it cheap
+        to embed static fragments in many documents. Calling :meth:`add`
+        again invalidates the cache. Changes made to descendants after
+        freezing are not detected.'''
+        self._frozen_html = None
+        self._frozen_html = ''.join(self.generate_html())
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen_html is not None
 
     def add(self, item: Any) -> None:
-        if isinstance(item, ElementCollection):
+        self._frozen_html = None
+        # dispatch on the exact type first, since almost all children are elements, text or HTML
+        cls = item.__class__
+        if cls is Element or cls is HTML:
+            self.children.append(item)
+        elif cls is str:
+            self.children.append(escape(item))
+        elif isinstance(item, ElementCollection) and not item.frozen:
             self.children.extend(item.children)
         elif isinstance(item, Component):
             raise TypeError('trying to use a component as a fragment, use it as a context manager or iterable instead')
         else:
-            self.children.append(into_html(item))
+            self.children.append(into_child(item))
+
+    def start_html(self) -> str:
+        return ''
+
+    def end_html(self) -> str:
+        return ''
 
     def generate_html(self) -> Iterator[str]:
-        for item in self.children:
-            if isinstance(item, Node):
-                yield from item.generate_html()
+        '''Yield the HTML of this node in pieces.
+
+        The tree is walked using an explicit stack rather than recursion,
+        so the cost per node does not depend on how deeply it is nested.'''
+        if self._frozen_html is not None:
+            yield self._frozen_html
+            return
+        start = self.start_html()
+        if start:
+            yield start
+        stack = [(iter(self.children), self.end_html())]
+        while stack:
+            children, end = stack[-1]
+            for item in children:
+                if item.__class__ is str:
+                    yield item
+                    continue
+                if isinstance(item, Node):
+                    if item._frozen_html is not None:
+                        yield item._frozen_html
+                        continue
+                    start = item.start_html()
+                    if start:
+                        yield start
+                    stack.append((iter(item.children), item.end_html()))
+                    break
+                yield child_html(item)
             else:
-                yield item.__html__()
+                stack.pop()
+                if end:
+                    yield end
 
     def __html__(self) -> str:
+        if self._frozen_html is not None:
+            return self._frozen_html
         return ''.join(self.generate_html())
 
     def __enter__(self) -> None:
@@ -36,72 +126,161 @@ class Node(HTML, ContextManager):
 
     def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException],
                  traceback: Optional[TracebackType]) -> None:
-        stack = get_stack()
-        stack.pop(self)
-        stack.add(self)
+        get_stack().close(self)
 
 
 class ElementCollection(Node):
+    __slots__ = ()
+
     def __enter__(self) -> None:
         raise TypeError('trying to use a fragment as a component, yield it instead')
 
 
+class LazyChildren:
+    '''Converts the items of a lazy source to HTML while it is being iterated over.'''
+    __slots__ = ('source', 'raw')
+
+    def __init__(self, source: Any, raw: bool) -> None:
+        self.source = source
+        self.raw = raw
+
+    def __iter__(self) -> Iterator[Child]:
+        source = self.source
+        if callable(source):
+            source = source()
+        if isinstance(source, (str, HTML)) or not hasattr(source, '__iter__'):
+            source = (source,)
+        raw = self.raw
+        for item in source:
+            if isinstance(item, HTML):
+                yield item
+            elif isinstance(item, Component):
+                raise TypeError('trying to use a component as a fragment, use it as a context manager or iterable instead')
+            else:
+                yield str(item) if raw else escape(item)
+
+
+class LazyNode(Node):
+    '''Children that are produced only when the node is serialized, see :func:`lazy`.'''
+    __slots__ = ()
+
+    def __init__(self, source: Any, raw: bool = False) -> None:
+        super().__init__(LazyChildren(source, raw))  # type: ignore
+
+    def __repr__(self) -> str:
+        return f'LazyNode({self.source!r})'
+
+    @property
+    def source(self) -> Any:
+        return self.children.source  # type: ignore
+
+    def as_raw_text(self) -> 'LazyNode':
+        '''Return a node producing the same children without escaping them,
+        for use in ``<script>`` and ``<style>``.'''
+        return LazyNode(self.source, raw=True)
+
+    def add(self, item: Any) -> None:
+        raise TypeError('cannot add children to a lazy node')
+
+    def __enter__(self) -> None:
+        raise TypeError('cannot add children to a lazy node')
+
+
+def raw_text(item: Any) -> Child:
+    '''Convert a child of a raw text element such as ``<script>`` to HTML, without escaping it.'''
+    if isinstance(item, LazyNode):
+        return item.as_raw_text()
+    if isinstance(item, HTML):
+        return item
+    return str(item)
+
+
 class CommentNode(Node):
-    def generate_html(self) -> Iterator[str]:
-        yield '<!-- '
-        yield from super().generate_html()
-        yield ' -->'
+    __slots__ = ()
+
+    def start_html(self) -> str:
+        return '<!-- '
+
+    def end_html(self) -> str:
+        return ' -->'
 
 
-@dataclass
 class Element(Node):
-    tagname: str
-    attributes: Dict[str, Any]
+    __slots__ = ('tagname', '_attributes', '_start_tag')
+
+    def __init__(self, children: List[Child], tagname: str, attributes: Dict[str, Any]) -> None:
+        if children and tagname in VOID_ELEMENTS:
+            raise TypeError(f'<{tagname}> cannot have children')
+        self.children = children
+        self._frozen_html = None
+        self.tagname = tagname
+        # most elements have no attributes, so the empty dict is only created when asked for
+        self._attributes: Optional[Dict[str, Any]] = attributes or None
+        self._start_tag: Optional[str] = None
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        '''The attributes of the element, which can be changed in place.
+
+        Since they could be changed, asking for them discards the cached
+        start tag and frozen HTML of this element.'''
+        if self._attributes is None:
+            self._attributes = {}
+        self._start_tag = None
+        self._frozen_html = None
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes: Dict[str, Any]) -> None:
+        self._attributes = attributes
+        self._start_tag = None
+        self._frozen_html = None
+
+    def __repr__(self) -> str:
+        return (f'{type(self).__qualname__}(children={self.children!r}, tagname={self.tagname!r}, '
+                f'attributes={self._attributes or {}!r})')
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is self.__class__:
+            assert isinstance(other, Element)
+            return ((self.children, self.tagname, self._attributes or {}) ==
+                    (other.children, other.tagname, other._attributes or {}))
+        return NotImplemented
 
-    def __post_init__(self) -> None:
-        if self.children and self.tagname in VOID_ELEMENTS:
-            raise TypeError(f'<{self.tagname}> cannot have children')
+    __hash__ = None  # type: ignore
 
     def has_closing_tag(self) -> bool:
         return self.tagname not in VOID_ELEMENTS
 
-    def generate_attribute(self, key: str, value: Any) -> Iterator[str]:
-        if value is False:
-            return
-        yield ' '
-        yield convert_identifier(key)
-        if value is True:
-            return
-        yield '="'
-        yield escape(value)
-        yield '"'
+    def start_html(self) -> str:
+        '''The opening tag, serialized once on first use (and again after
+        :attr:`attributes` has been used).'''
+        if self._start_tag is None:
+            self._start_tag = serialize_start_tag(self.tagname, self._attributes)
+        return self._start_tag
 
-    def generate_html(self) -> Iterator[str]:
-        yield '<'
-        yield self.tagname
-        for key, value in self.attributes.items():
-            if isinstance(value, list):
-                value = ' '.join(str(item) for item in value)
-            yield from self.generate_attribute(key, value)
-        yield '>'
-        if self.tagname not in VOID_ELEMENTS:
-            yield from super().generate_html()
+    def end_html(self) -> str:
         if self.has_closing_tag():
-            yield '</'
-            yield self.tagname
-            yield '>'
+            return f'</{self.tagname}>'
+        return ''
 
     def add(self, item: Any) -> None:
-        if self.tagname in VOID_ELEMENTS:
-            raise TypeError(f'<{self.tagname}> cannot have children')
-        if self.tagname in RAW_TEXT_ELEMENTS:
-            if not isinstance(item, HTML):
-                item = HTML(item)
-        super().add(item)
+        if self.tagname in SPECIAL_CONTENT_ELEMENTS:
+            if self.tagname in VOID_ELEMENTS:
+                raise TypeError(f'<{self.tagname}> cannot have children')
+            item = raw_text(item)
+            if item.__class__ is str:
+                # already converted, without escaping
+                self._frozen_html = None
+                self.children.append(item)
+                return
+        Node.add(self, item)
 
 
 class DocumentElement(Element):
-    def __init__(self, children: List[HTML]) -> None:
+    __slots__ = ()
+
+    def __init__(self, children: List[Child]) -> None:
         super().__init__(children, '!doctype', dict(html=True))
 
     def has_closing_tag(self) -> bool:
@@ -0,0 +1,70 @@
+'''Constructing independent parts of a page at the same time.'''
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from threading import Lock
+from typing import Any, Callable, Optional
+
+from .context import NodeStack, current_node_stack
+from .html import HTML
+from .nodes import ElementCollection
+
+__all__ = ['parallel']
+
+in_parallel_task: ContextVar[bool] = ContextVar('in_parallel_task', default=False)
+
+_default_executor: Optional[ThreadPoolExecutor] = None
+_default_executor_lock = Lock()
+
+
+def default_executor() -> ThreadPoolExecutor:
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ThreadPoolExecutor(thread_name_prefix='generate_html')
+        return _default_executor
+
+
+def _run_task(f: Callable[[], Any]) -> Any:
+    # runs in a copy of the caller's context, with a stack of its own
+    current_node_stack.set(NodeStack([]))
+    in_parallel_task.set(True)
+    return f()
+
+
+def parallel(*functions: Callable[[], Any], executor: Optional[Executor] = None) -> HTML:
+    '''Call functions without arguments in a thread pool, and combine their results in order.
+
+    ::
+
+        @document
+        def page(user):
+            with tag.body():
+                yield parallel(sidebar, partial(product_list, user), partial(recommendations, user))
+
+    This is useful when building parts of a page involves waiting for I/O,
+    such as database queries (or, on free-threaded Python builds, for
+    CPU-bound work). Pass the functions themselves, not the result of
+    calling them. Each one runs in a copy of the current context, so
+    context variables set by the caller are visible. If any of them
+    raise an exception, all of them are waited for and the exception
+    of the first one (in argument order) is raised.
+
+    By default a shared :class:`~concurrent.futures.ThreadPoolExecutor` is
+    used. Calls of ``parallel`` inside one of the functions run their
+    functions one after the other, so tasks never wait for other tasks
+    that could be stuck in the queue behind them.
+    '''
+    if in_parallel_task.get() or len(functions) < 2:
+        results = [f() for f in functions]
+    else:
+        pool = executor if executor is not None else default_executor()
+        futures = [pool.submit(copy_context().run, _run_task, f) for f in functions]
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        results = [future.result() for future in futures]
+    collection = ElementCollection([])
+    for result in results:
+        collection.add(result)
+    return collection
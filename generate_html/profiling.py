@@ -0,0 +1,280 @@
+'''Measuring where rendering time goes.
+
+Everything constructed while a :class:`Profiler` is active is recorded::
+
+    with Profiler() as profiler:
+        html = render_html(page())
+    print(profiler.report())
+
+For every call of a :func:`fragment` or :func:`document` the profiler
+records the time spent constructing it, the number of nodes in the result
+and the time and number of (UTF-8 encoded) bytes it takes to serialize it
+(unless it contains :func:`lazy` children).
+Components are recorded one step at a time, between their
+:func:`contents` markers, but counted as one call. Measuring a result means serializing it, so
+rendering is slower while profiling. When no profiler is active, the cost
+is a single context variable lookup per call.
+'''
+import json
+import threading
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from operator import attrgetter
+from time import perf_counter
+from typing import (IO, Any, Awaitable, Callable, Dict, Iterator, List,
+                    Optional, Tuple, Type, TypeVar)
+
+from .components import ComponentContents
+from .html import HTML, into_html
+from .nodes import DocumentElement, ElementCollection, LazyNode, Node
+
+__all__ = ['Profiler', 'Event', 'FunctionStats', 'current_profiler']
+
+R = TypeVar('R')
+
+current_profiler: ContextVar[Optional['Profiler']] = ContextVar('current_profiler', default=None)
+
+_DONE = object()
+
+
+@dataclass
+class Event:
+    '''One measured call (or component step).
+
+    ``duration`` excludes the time spent measuring, ``self_time``
+    additionally excludes the time spent in nested fragments and components.
+    ``call`` is false for the steps of a component after the first one.'''
+    name: str
+    kind: str
+    start: float
+    duration: float
+    self_time: float
+    render_time: float
+    nodes: int
+    bytes: int
+    thread: int
+    call: bool = True
+
+
+@dataclass
+class FunctionStats:
+    name: str
+    kind: str
+    calls: int = 0
+    total_time: float = 0.0
+    self_time: float = 0.0
+    render_time: float = 0.0
+    nodes: int = 0
+    bytes: int = 0
+
+
+def function_name(f: Callable) -> str:
+    return f'{f.__module__}.{f.__qualname__}'
+
+
+def node_kind(top_level: Type[Node]) -> str:
+    return 'document' if issubclass(top_level, DocumentElement) else 'fragment'
+
+
+def count_nodes(html: HTML) -> Tuple[int, bool]:
+    '''Count the elements and comments in a tree, and whether it contains
+    lazy children (which are not counted).'''
+    if not isinstance(html, Node):
+        return 0, False
+    count = 0
+    has_lazy = False
+    stack = [html]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, LazyNode):
+            has_lazy = True
+            continue
+        if not isinstance(node, ElementCollection):
+            count += 1
+        stack.extend(child for child in node.children if isinstance(child, Node))
+    return count, has_lazy
+
+
+class Profiler:
+    '''Records construction and serialization statistics while active.
+
+    ``callback`` is called with every :class:`Event` as it is recorded. If
+    ``trace`` is true, the events are kept as well, so they can be exported
+    with :meth:`write_chrome_trace`.
+
+    A profiler can be activated in several threads at once, but it only
+    sees the threads (and tasks) it was activated in.'''
+    def __init__(self, *, callback: Optional[Callable[[Event], None]] = None, trace: bool = False,
+                 timer: Callable[[], float] = perf_counter) -> None:
+        self.callback = callback
+        self.trace = trace
+        self.timer = timer
+        self.stats: Dict[Tuple[str, str], FunctionStats] = {}
+        self.events: List[Event] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tokens: List[Token] = []
+
+    def __enter__(self) -> 'Profiler':
+        self._tokens.append(current_profiler.set(self))
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        current_profiler.reset(self._tokens.pop())
+
+    @property
+    def _frames(self) -> List[List[float]]:
+        try:
+            return self._local.frames
+        except AttributeError:
+            self._local.frames = []
+            return self._local.frames
+
+    def _timed(self, build: Callable[[], R]) -> Tuple[R, float, float, List[float]]:
+        # each frame collects [time spent in nested calls, time spent measuring them]
+        frames = self._frames
+        frame = [0.0, 0.0]
+        frames.append(frame)
+        start = self.timer()
+        try:
+            result = build()
+        finally:
+            elapsed = self.timer() - start
+            frames.pop()
+        return result, start, elapsed, frame
+
+    def _finish(self, name: str, kind: str, results: List[Any], start: float, elapsed: float,
+                frame: List[float], call: bool = True) -> None:
+        measure_start = self.timer()
+        pieces = [into_html(result) for result in results]
+        counts = [count_nodes(piece) for piece in pieces]
+        nodes = sum(count for count, _ in counts)
+        if any(has_lazy for _, has_lazy in counts):
+            # serializing would consume lazy children before the real render does
+            render_time = 0.0
+            size = 0
+        else:
+            render_start = self.timer()
+            text = ''.join([piece.__html__() for piece in pieces])
+            render_time = self.timer() - render_start
+            size = len(text.encode('utf-8', 'surrogatepass'))
+        measure_time = self.timer() - measure_start
+        frames = self._frames
+        if frames:
+            frames[-1][0] += elapsed + measure_time
+            frames[-1][1] += frame[1] + measure_time
+        self.record(Event(name, kind, start, elapsed - frame[1], elapsed - frame[0], render_time, nodes, size,
+                          threading.get_ident(), call))
+
+    def record(self, event: Event) -> None:
+        with self._lock:
+            stats = self.stats.get((event.name, event.kind))
+            if stats is None:
+                stats = self.stats[event.name, event.kind] = FunctionStats(event.name, event.kind)
+            if event.call:
+                stats.calls += 1
+            stats.total_time += event.duration
+            stats.self_time += event.self_time
+            stats.render_time += event.render_time
+            stats.nodes += event.nodes
+            stats.bytes += event.bytes
+            if self.trace:
+                self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def start(self) -> Tuple[float, List[float]]:
+        '''Start measuring a construction, and return what :meth:`stop` needs.
+
+        Unlike :meth:`profile`, this adds no function calls around the
+        construction itself, so deeply nested fragments stay within the
+        recursion limit.'''
+        frame = [0.0, 0.0]
+        self._frames.append(frame)
+        return self.timer(), frame
+
+    def stop(self, f: Callable, kind: str, result: Optional[HTML], started: Tuple[float, List[float]]) -> None:
+        '''Finish measuring a construction of the result of a call to ``f``,
+        and record it (unless ``result`` is ``None`` because it failed).'''
+        start, frame = started
+        elapsed = self.timer() - start
+        self._frames.pop()
+        if result is not None:
+            self._finish(function_name(f), kind, [result], start, elapsed, frame)
+
+    def profile(self, f: Callable, kind: str, build: Callable[[], HTML]) -> HTML:
+        'Construct the result of a call to ``f`` with ``build()``, and record it.'
+        started = self.start()
+        result = None
+        try:
+            result = build()
+        finally:
+            self.stop(f, kind, result, started)
+        return result
+
+    async def profile_async(self, f: Callable, kind: str, build: Awaitable[HTML]) -> HTML:
+        # other tasks run while this one is suspended, so only the total time is meaningful
+        start = self.timer()
+        result = await build
+        elapsed = self.timer() - start
+        self._finish(function_name(f), kind, [result], start, elapsed, [elapsed, 0.0])
+        return result
+
+    def profile_component(self, f: Callable[..., Iterator], args: Tuple[Any, ...],
+                          kwargs: Dict[str, Any]) -> Iterator:
+        'Run a component function, recording each step between its contents markers.'
+        name = function_name(f)
+        it = f(*args, **kwargs)
+        pending: List[Any] = []
+        start: Optional[float] = None
+        elapsed = 0.0
+        frame = [0.0, 0.0]
+        call = True
+        while True:
+            item, step_start, step_elapsed, step_frame = self._timed(lambda: next(it, _DONE))
+            if start is None:
+                start = step_start
+            elapsed += step_elapsed
+            frame[0] += step_frame[0]
+            frame[1] += step_frame[1]
+            if isinstance(item, ComponentContents) or item is _DONE:
+                self._finish(name, 'component', pending, start, elapsed, frame, call)
+                if item is _DONE:
+                    return
+                call = False
+                pending.clear()
+                start = None
+                elapsed = 0.0
+                frame = [0.0, 0.0]
+            else:
+                pending.append(item)
+            yield item
+
+    def report(self, limit: Optional[int] = None) -> str:
+        '''Return a table of the recorded functions, the most expensive
+        (by self time) first.'''
+        with self._lock:
+            rows = sorted(self.stats.values(), key=attrgetter('self_time'), reverse=True)[:limit]
+        lines = [f'{"calls":>8} {"total ms":>10} {"self ms":>10} {"render ms":>10} {"nodes":>9} {"bytes":>11}  name']
+        for stats in rows:
+            lines.append(f'{stats.calls:8d} {stats.total_time * 1e3:10.3f} {stats.self_time * 1e3:10.3f} '
+                         f'{stats.render_time * 1e3:10.3f} {stats.nodes:9d} {stats.bytes:11d}  '
+                         f'{stats.name} ({stats.kind})')
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        '''Return the recorded events in the Chrome trace event format,
+        for ``chrome://tracing`` or Perfetto.'''
+        if not self.trace:
+            raise ValueError('events are only kept if the profiler is created with trace=True')
+        with self._lock:
+            events = list(self.events)
+        return {'traceEvents': [{
+            'name': event.name, 'cat': event.kind, 'ph': 'X', 'pid': 0, 'tid': event.thread,
+            'ts': event.start * 1e6, 'dur': event.duration * 1e6,
+            'args': {'self_ms': event.self_time * 1e3, 'render_ms': event.render_time * 1e3,
+                     'nodes': event.nodes, 'bytes': event.bytes},
+        } for event in events], 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, file: IO[str]) -> None:
+        json.dump(self.chrome_trace(), file)
@@ -0,0 +1,300 @@
+'''A compact binary format for node trees, for caching them between processes.
+
+Unlike cached HTML strings, a loaded tree can still be changed, diffed or
+embedded in other trees::
+
+    data = dumps(product_card(product))
+    ...
+    card = loads(data)
+
+The format is a flat array of 32-bit opcodes and operands, followed by a
+table of all distinct strings in the tree, so nothing is stored twice.
+:func:`loads` accepts any buffer, such as a :class:`memoryview` or an
+:class:`mmap.mmap`, and reads the opcodes from it without copying them, so
+trees can be shared between processes through files on local disk (see
+:func:`load`). The strings are copied into the loaded tree, so the buffer
+can be closed afterwards.
+
+Elements, comments, fragments, documents, text and :class:`HTML` are
+stored as they are, including whether nodes are frozen. Other kinds of
+HTML, such as instances of subclasses, are stored as the HTML they
+render to. Attribute values that are not strings, booleans, ``None``,
+numbers or lists are stored as strings. :func:`lazy` children cannot be
+stored, since that would consume them.
+
+The data is only meant to be read by the same version of this library on
+the same kind of machine; :func:`loads` raises :class:`ValueError` for
+data it does not recognize.
+'''
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Union
+
+from .html import HTML, into_html
+from .nodes import (CommentNode, DocumentElement, Element, ElementCollection,
+                    LazyNode, Node)
+
+__all__ = ['dumps', 'loads', 'load']
+
+MAGIC = 0x31544847  # b'GHT1' in little endian
+HEADER = struct.Struct('<3I')  # magic, number of strings, number of opcode words
+
+# opcodes, followed by their operands
+TEXT = 0  # string: escaped text
+RAW = 1  # string: an HTML object
+ELEMENT = 2  # tag name string, number of attributes, attributes: starts an element
+COLLECTION = 3  # starts a fragment
+COMMENT = 4  # starts a comment
+DOCUMENT = 5  # starts a document
+END = 6  # ends the current node
+END_FROZEN = 7  # string: ends the current node, with its frozen HTML
+TEXT_ELEMENT = 8  # like ELEMENT, followed by a string: an element containing only text
+
+# kinds of attribute values, followed by the value
+VALUE_STR = 0  # string
+VALUE_INT = 1  # string
+VALUE_FLOAT = 2  # string
+VALUE_TRUE = 3
+VALUE_FALSE = 4
+VALUE_NONE = 5
+VALUE_LIST = 6  # number of items, items
+
+NODE_CLASSES: Dict[int, Callable[[List[Any]], Node]] = {
+    COLLECTION: ElementCollection, COMMENT: CommentNode, DOCUMENT: DocumentElement}
+
+
+class _Writer:
+    def __init__(self) -> None:
+        self.strings: Dict[str, int] = {}
+        self.words = array('I')
+
+    def string(self, value: str) -> int:
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def value(self, value: Any) -> None:
+        words = self.words
+        if value is True:
+            words.append(VALUE_TRUE)
+        elif value is False:
+            words.append(VALUE_FALSE)
+        elif value is None:
+            words.append(VALUE_NONE)
+        elif isinstance(value, list):
+            words.append(VALUE_LIST)
+            words.append(len(value))
+            for item in value:
+                self.value(item)
+        elif value.__class__ is int:
+            words.append(VALUE_INT)
+            words.append(self.string(str(value)))
+        elif value.__class__ is float:
+            words.append(VALUE_FLOAT)
+            words.append(self.string(repr(value)))
+        else:
+            words.append(VALUE_STR)
+            words.append(self.string(str(value)))
+
+    def element(self, op: int, element: Element) -> None:
+        words = self.words
+        attributes = element._attributes or {}
+        words.append(op)
+        words.append(self.string(element.tagname))
+        words.append(len(attributes))
+        for key, value in attributes.items():
+            words.append(self.string(key))
+            self.value(value)
+
+    def start(self, node: Node) -> None:
+        words = self.words
+        cls = node.__class__
+        if cls is Element:
+            assert isinstance(node, Element)
+            self.element(ELEMENT, node)
+        elif cls is ElementCollection:
+            words.append(COLLECTION)
+        elif cls is CommentNode:
+            words.append(COMMENT)
+        else:
+            words.append(DOCUMENT)
+
+    def end(self, node: Node) -> None:
+        if node._frozen_html is not None:
+            self.words.append(END_FROZEN)
+            self.words.append(self.string(node._frozen_html))
+        else:
+            self.words.append(END)
+
+    def child(self, item: Any) -> bool:
+        '''Write a child that has no children of its own, or return
+        ``False`` if it is a node that has to be walked.'''
+        cls = item.__class__
+        if cls is str:
+            self.words.append(TEXT)
+            self.words.append(self.string(item))
+        elif cls is Element and len(item.children) == 1 and item.children[0].__class__ is str and not item.frozen:
+            # most elements with text, such as table cells, take a single opcode this way
+            self.element(TEXT_ELEMENT, item)
+            self.words.append(self.string(item.children[0]))
+        elif cls is Element or cls is ElementCollection or cls is CommentNode or cls is DocumentElement:
+            return False
+        elif isinstance(item, LazyNode):
+            raise TypeError('lazy children cannot be serialized')
+        else:
+            self.words.append(RAW)
+            self.words.append(self.string(item.__html__()))
+        return True
+
+    def tree(self, root: HTML) -> None:
+        if self.child(root):
+            return
+        assert isinstance(root, Node)
+        self.start(root)
+        stack = [(iter(root.children), root)]
+        while stack:
+            children, node = stack[-1]
+            for item in children:
+                if not self.child(item):
+                    assert isinstance(item, Node)
+                    self.start(item)
+                    stack.append((iter(item.children), item))
+                    break
+            else:
+                stack.pop()
+                self.end(node)
+
+    def getvalue(self) -> bytes:
+        strings = list(self.strings)
+        offsets = array('I', [0])
+        total = 0
+        for value in strings:
+            total += len(value)
+            offsets.append(total)
+        words = self.words
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+            words = array('I', words)
+            words.byteswap()
+        return b''.join([HEADER.pack(MAGIC, len(strings), len(words)), offsets.tobytes(), words.tobytes(),
+                         ''.join(strings).encode('utf-8', 'surrogatepass')])
+
+
+def dumps(thing: Any) -> bytes:
+    '''Serialize a tree (or anything else that can be rendered) to bytes.'''
+    if array('I').itemsize != 4:
+        raise RuntimeError('unsupported platform')  # pragma: no cover
+    writer = _Writer()
+    writer.tree(into_html(thing))
+    return writer.getvalue()
+
+
+def _words(buffer: memoryview, start: int, count: int) -> Any:
+    with buffer[start:start + 4 * count] as view:
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        words = array('I', view.tobytes())  # pragma: no cover
+    words.byteswap()  # pragma: no cover
+    return words  # pragma: no cover
+
+
+def loads(data: Any) -> HTML:
+    '''Load a tree serialized by :func:`dumps` from a bytes-like object,
+    such as :class:`bytes`, a :class:`memoryview` or an :class:`mmap.mmap`.'''
+    with memoryview(data) as view, view.cast('B') as buffer:
+        if len(buffer) < HEADER.size:
+            raise ValueError('not a serialized tree')
+        magic, string_count, word_count = HEADER.unpack_from(buffer)
+        offsets_start = HEADER.size
+        words_start = offsets_start + 4 * (string_count + 1)
+        text_start = words_start + 4 * word_count
+        if magic != MAGIC or len(buffer) < text_start:
+            raise ValueError('not a serialized tree')
+        offsets = _words(buffer, offsets_start, string_count + 1)
+        words = _words(buffer, words_start, word_count)
+        try:
+            with buffer[text_start:] as text_view:
+                text = str(text_view, 'utf-8', 'surrogatepass')
+            if len(text) != offsets[string_count]:
+                raise ValueError('corrupt serialized tree')
+            strings = [text[offsets[i]:offsets[i + 1]] for i in range(string_count)]
+            return _build(iter(words), strings)
+        except (IndexError, StopIteration, UnicodeDecodeError) as exc:
+            raise ValueError('corrupt serialized tree') from exc
+        finally:
+            # views of an mmap have to be released before it can be closed
+            if isinstance(words, memoryview):
+                offsets.release()
+                words.release()
+
+
+def _value(kind: int, words: Iterator[int], strings: List[str]) -> Any:
+    if kind == VALUE_STR:
+        return strings[next(words)]
+    if kind == VALUE_INT:
+        return int(strings[next(words)])
+    if kind == VALUE_FLOAT:
+        return float(strings[next(words)])
+    if kind == VALUE_TRUE:
+        return True
+    if kind == VALUE_FALSE:
+        return False
+    if kind == VALUE_NONE:
+        return None
+    if kind == VALUE_LIST:
+        return [_value(next(words), words, strings) for _ in range(next(words))]
+    raise ValueError(f'unknown attribute value kind {kind}')
+
+
+def _build(words: Iterator[int], strings: List[str]) -> HTML:
+    root = ElementCollection([])
+    stack: List[Node] = [root]
+    children = root.children
+    for op in words:
+        if op == TEXT:
+            children.append(strings[next(words)])
+        elif op == TEXT_ELEMENT:
+            tagname = strings[next(words)]
+            count = next(words)
+            attributes = ({strings[next(words)]: _value(next(words), words, strings) for _ in range(count)}
+                          if count else None)
+            children.append(Element([strings[next(words)]], tagname, attributes))  # type: ignore
+        elif op == ELEMENT:
+            tagname = strings[next(words)]
+            count = next(words)
+            attributes = ({strings[next(words)]: _value(next(words), words, strings) for _ in range(count)}
+                          if count else None)
+            node: Node = Element([], tagname, attributes)  # type: ignore
+            children.append(node)
+            stack.append(node)
+            children = node.children
+        elif op == END:
+            stack.pop()
+            children = stack[-1].children
+        elif op == RAW:
+            children.append(HTML(strings[next(words)]))
+        elif op == END_FROZEN:
+            stack.pop()._frozen_html = strings[next(words)]
+            children = stack[-1].children
+        elif op in NODE_CLASSES:
+            node = NODE_CLASSES[op]([])
+            children.append(node)
+            stack.append(node)
+            children = node.children
+        else:
+            raise ValueError(f'unknown opcode {op}')
+    if len(stack) != 1 or len(root.children) != 1:
+        raise ValueError('unbalanced serialized tree')
+    result = root.children[0]
+    return result if isinstance(result, HTML) else HTML(result)
+
+
+def load(path: Union[str, 'os.PathLike[str]']) -> HTML:
+    '''Load a tree from a file written with the result of :func:`dumps`,
+    by mapping it into memory rather than reading it.'''
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return loads(mapped)
@@ -0,0 +1,186 @@
+import os
+import zlib
+from inspect import isawaitable
+from itertools import islice
+from typing import (Any, AsyncIterator, BinaryIO, Iterator, List, Optional,
+                    Union)
+
+from .html import into_html, render_html
+from .minify import generate_minified_html
+from .nodes import Node
+
+DEFAULT_CHUNK_SIZE = 16384
+DEFAULT_BUFFER_SIZE = 65536
+TOKEN_BATCH_SIZE = 64
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024
+
+
+def generate_tokens(thing: Any, minify: bool = False) -> Iterator[str]:
+    html = into_html(thing)
+    if isinstance(html, Node):
+        yield from generate_minified_html(html) if minify else html.generate_html()
+    else:
+        yield html.__html__()
+
+
+def iter_html(thing: Any, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              first_chunk_size: Optional[int] = None, *, minify: bool = False) -> Iterator[str]:
+    '''Render something as HTML, yielding it in pieces.
+
+    The many small strings produced while walking the tree are combined
+    into chunks of at least ``chunk_size`` characters (except the last
+    one), so the whole document never needs to be in memory at once::
+
+        ''.join(iter_html(thing)) == render_html(thing)
+
+    A smaller ``first_chunk_size`` gets the start of the document out sooner.
+    ``minify`` works as for :func:`render_html`.
+    '''
+    if first_chunk_size is None:
+        first_chunk_size = chunk_size
+    if chunk_size < 1 or first_chunk_size < 1:
+        raise ValueError('chunk sizes must be positive')
+    tokens = generate_tokens(thing, minify)
+    buffer: List[str] = []
+    size = 0
+    threshold = first_chunk_size
+    while True:
+        # joining a batch of tokens at a time keeps the per-token work in C
+        batch = list(islice(tokens, TOKEN_BATCH_SIZE))
+        if not batch:
+            break
+        piece = ''.join(batch)
+        if size + len(piece) < threshold:
+            buffer.append(piece)
+            size += len(piece)
+            continue
+        # the chunk is complete somewhere in this batch, so it ends at the token that completes it
+        for token in batch:
+            buffer.append(token)
+            size += len(token)
+            if size >= threshold:
+                yield ''.join(buffer)
+                buffer.clear()
+                size = 0
+                threshold = chunk_size
+    if size:
+        yield ''.join(buffer)
+
+
+FLUSH_POLICIES = ('none', 'first', 'sync')
+
+
+def iter_gzip(thing: Any, level: int = 6, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              first_chunk_size: Optional[int] = None, flush: str = 'first', encoding: str = 'utf-8', *,
+              minify: bool = False) -> Iterator[bytes]:
+    '''Render something as gzip-compressed HTML, suitable for ``Content-Encoding: gzip``.
+
+    Every chunk produced by :func:`iter_html` is compressed as soon as it
+    has been rendered. Unless a chunk is flushed, the compressor may hold on
+    to it to compress it better together with what follows. ``flush`` decides
+    when that happens:
+
+    ``'none'``
+        only at the end, for the smallest output
+    ``'first'``
+        after the first chunk, so the browser can start on the ``<head>``
+    ``'sync'``
+        after every chunk, so everything rendered is sent right away
+    '''
+    if flush not in FLUSH_POLICIES:
+        raise ValueError(f'flush must be one of {", ".join(map(repr, FLUSH_POLICIES))}')
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    first = True
+    for chunk in iter_html(thing, chunk_size, first_chunk_size, minify=minify):
+        data = compressor.compress(chunk.encode(encoding))
+        if flush == 'sync' or flush == 'first' and first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        first = False
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def render_bytes(thing: Any, encoding: str = 'utf-8', *, minify: bool = False) -> bytes:
+    '''Render something as encoded HTML, without building the whole page as a string first.
+
+    ::
+
+        render_bytes(thing) == render_html(thing).encode()
+    '''
+    return b''.join([chunk.encode(encoding) for chunk in iter_html(thing, minify=minify)])
+
+
+def _writev_all(fd: int, pieces: List[Union[bytes, memoryview]]) -> None:
+    while pieces:
+        written = os.writev(fd, pieces[:IOV_MAX])
+        done = 0
+        for piece in pieces:
+            if written < len(piece):
+                break
+            written -= len(piece)
+            done += 1
+        del pieces[:done]
+        if written:
+            pieces[0] = memoryview(pieces[0])[written:]
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def render_to(thing: Any, target: Union[int, BinaryIO], encoding: str = 'utf-8',
+              buffer_size: int = DEFAULT_BUFFER_SIZE, chunk_size: int = DEFAULT_CHUNK_SIZE, *,
+              minify: bool = False) -> int:
+    '''Render something as encoded HTML directly to a binary file or a file descriptor.
+
+    The page is encoded one chunk of ``chunk_size`` characters at a time.
+    Chunks are written as soon as ``buffer_size`` bytes have been collected;
+    if ``target`` is a file descriptor, they are written together with
+    :func:`os.writev` (where available) rather than being joined first.
+    Returns the number of bytes written.'''
+    total = 0
+    pieces: List[Union[bytes, memoryview]] = []
+    size = 0
+    for chunk in iter_html(thing, chunk_size, minify=minify):
+        piece = chunk.encode(encoding)
+        pieces.append(piece)
+        size += len(piece)
+        if size >= buffer_size:
+            _flush(target, pieces)
+            total += size
+            size = 0
+    if size:
+        _flush(target, pieces)
+        total += size
+    return total
+
+
+def _flush(target: Union[int, BinaryIO], pieces: List[Union[bytes, memoryview]]) -> None:
+    if not isinstance(target, int):
+        for piece in pieces:
+            target.write(piece)
+    elif hasattr(os, 'writev'):
+        _writev_all(target, pieces)
+    else:
+        _write_all(target, b''.join(pieces))
+    pieces.clear()
+
+
+async def render_html_async(thing: Any) -> str:
+    '''Like :func:`render_html`, but also accepts awaitables, such as
+    the result of calling an async :func:`document` or :func:`fragment`.'''
+    if isawaitable(thing):
+        thing = await thing
+    return render_html(thing)
+
+
+async def aiter_html(thing: Any, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     first_chunk_size: Optional[int] = None) -> AsyncIterator[str]:
+    '''Like :func:`iter_html`, but as an async iterator that also accepts awaitables.'''
+    if isawaitable(thing):
+        thing = await thing
+    for chunk in iter_html(thing, chunk_size, first_chunk_size):
+        yield chunk
@@ -0,0 +1,65 @@
+'''Adapters that send rendered HTML as streaming WSGI and ASGI responses.
+
+Neither adapter sets ``Content-Length``, so servers use chunked transfer
+encoding (or close the connection) and the first chunk can be sent as
+soon as it has been rendered.'''
+from inspect import isawaitable
+from typing import (Any, Awaitable, Callable, Dict, Iterable, Iterator,
+                    List, MutableMapping, Optional, Tuple)
+
+from .streaming import DEFAULT_CHUNK_SIZE, iter_gzip, iter_html
+
+DEFAULT_FIRST_CHUNK_SIZE = 4096
+
+StartResponse = Callable[..., Any]
+ASGISend = Callable[[MutableMapping[str, Any]], Awaitable[None]]
+
+
+def wsgi_response(thing: Any, start_response: StartResponse, *, status: str = '200 OK',
+                  headers: Iterable[Tuple[str, str]] = (), chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  first_chunk_size: Optional[int] = DEFAULT_FIRST_CHUNK_SIZE,
+                  encoding: str = 'utf-8', compress_level: Optional[int] = None) -> Iterator[bytes]:
+    '''Start a WSGI response and return an iterable of encoded chunks::
+
+        def application(environ, start_response):
+            return wsgi_response(page(), start_response)
+
+    If ``compress_level`` is given, the response is compressed with
+    :func:`iter_gzip`. Only do this if the client accepts gzip.
+    '''
+    response_headers = [('Content-Type', f'text/html; charset={encoding}'), *headers]
+    if compress_level is not None:
+        response_headers += [('Content-Encoding', 'gzip'), ('Vary', 'Accept-Encoding')]
+    start_response(status, response_headers)
+    if compress_level is not None:
+        return iter_gzip(thing, compress_level, chunk_size, first_chunk_size, encoding=encoding)
+    return (chunk.encode(encoding) for chunk in iter_html(thing, chunk_size, first_chunk_size))
+
+
+async def asgi_response(thing: Any, send: ASGISend, *, status: int = 200,
+                        headers: Iterable[Tuple[bytes, bytes]] = (), chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        first_chunk_size: Optional[int] = DEFAULT_FIRST_CHUNK_SIZE,
+                        encoding: str = 'utf-8', compress_level: Optional[int] = None) -> None:
+    '''Send an HTTP response through an ASGI ``send`` callable, one chunk at a time::
+
+        async def application(scope, receive, send):
+            await asgi_response(page(), send)
+
+    ``thing`` can be awaitable, such as the result of an async :func:`document`.
+    ``compress_level`` works as for :func:`wsgi_response`.
+    '''
+    if isawaitable(thing):
+        thing = await thing
+    response_headers: List[Tuple[bytes, bytes]] = [
+        (b'content-type', f'text/html; charset={encoding}'.encode('latin-1')), *headers]
+    body: Iterable[bytes]
+    if compress_level is not None:
+        response_headers += [(b'content-encoding', b'gzip'), (b'vary', b'Accept-Encoding')]
+        body = iter_gzip(thing, compress_level, chunk_size, first_chunk_size, encoding=encoding)
+    else:
+        body = (chunk.encode(encoding) for chunk in iter_html(thing, chunk_size, first_chunk_size))
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    for data in body:
+        message: Dict[str, Any] = {'type': 'http.response.body', 'body': data, 'more_body': True}
+        await send(message)
+    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
@@ -0,0 +1,96 @@
+import asyncio
+from inspect import iscoroutinefunction
+from typing import AsyncIterator, Iterator, List
+
+import pytest
+
+from generate_html import (aiter_html, component, contents, document, fragment,
+                           render_html, render_html_async, tag)
+from generate_html.components import InvalidHTML
+
+
+@fragment
+def sync_item(name: str) -> Iterator:
+    yield tag.li(name)
+
+
+@component
+async def async_list() -> AsyncIterator:
+    await asyncio.sleep(0)
+    with tag.ul():
+        yield contents()
+
+
+@component
+async def async_items(names: List[str]) -> AsyncIterator:
+    for name in names:
+        await asyncio.sleep(0)
+        with tag.li():
+            yield contents(name)
+
+
+@fragment
+async def async_fragment(names: List[str]) -> AsyncIterator:
+    async with async_list():
+        for name in names:
+            await asyncio.sleep(0)
+            yield sync_item(name)
+
+
+@fragment
+async def async_iterate(names: List[str]) -> AsyncIterator:
+    async for name in async_items(names):
+        yield tag.b(name)
+
+
+@document
+async def async_document(title: str) -> AsyncIterator:
+    with tag.html():
+        await asyncio.sleep(0.01)
+        yield tag.title(title)
+        yield await async_fragment([title, title])
+
+
+@component
+async def no_contents() -> AsyncIterator:
+    yield tag.p()
+
+
+@fragment
+async def use_no_contents() -> AsyncIterator:
+    async with no_contents():
+        yield 'x'
+
+
+def test_async_fragment() -> None:
+    assert iscoroutinefunction(async_fragment)
+    assert render_html(asyncio.run(async_fragment(['a', '<b>']))) == '<ul><li>a</li><li>&lt;b&gt;</li></ul>'
+
+
+def test_async_component_iteration() -> None:
+    assert render_html(asyncio.run(async_iterate(['a', 'b']))) == '<li><b>a</b></li><li><b>b</b></li>'
+
+
+def test_concurrent_documents() -> None:
+    async def main() -> List[str]:
+        return await asyncio.gather(*(render_html_async(async_document(str(i))) for i in range(10)))
+    assert asyncio.run(main()) == [
+        f'<!doctype html><html><title>{i}</title><ul><li>{i}</li><li>{i}</li></ul></html>' for i in range(10)]
+
+
+def test_aiter_html() -> None:
+    async def main() -> List[str]:
+        return [chunk async for chunk in aiter_html(async_document('x'), chunk_size=10)]
+    chunks = asyncio.run(main())
+    assert len(chunks) > 1
+    assert ''.join(chunks) == '<!doctype html><html><title>x</title><ul><li>x</li><li>x</li></ul></html>'
+
+
+def test_async_invalid_component() -> None:
+    with pytest.raises(InvalidHTML):
+        asyncio.run(use_no_contents())
+
+
+def test_async_cannot_compile() -> None:
+    with pytest.raises(TypeError):
+        fragment(compiled=True)(async_iterate.__wrapped__)  # type: ignore
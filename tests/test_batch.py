@@ -0,0 +1,48 @@
+import pickle
+from typing import AsyncIterator, Iterator
+
+from generate_html import document, fragment, render_html, render_many, tag
+
+
+@document
+def product_page(name: str, price: int) -> Iterator:
+    with tag.html():
+        yield tag.h1(name)
+        yield tag.p(price)
+
+
+@fragment
+def failing(number: int) -> Iterator:
+    if number == 2:
+        raise ValueError('no twos')
+    yield tag.p(number)
+
+
+@fragment
+async def async_item(number: int) -> AsyncIterator:
+    yield tag.li(number)
+
+
+def test_pickle_nodes() -> None:
+    page = product_page('<Widget>', 3)
+    assert render_html(pickle.loads(pickle.dumps(page))) == render_html(page)
+
+
+def test_render_many_ordered() -> None:
+    args = [(f'item {i}', i) for i in range(20)]
+    results = list(render_many(product_page, args, workers=2, chunksize=3))
+    assert [result.index for result in results] == list(range(20))
+    assert [result.html for result in results] == [render_html(product_page(*arg)) for arg in args]
+
+
+def test_render_many_errors() -> None:
+    results = sorted(render_many(failing, [(i,) for i in range(4)], workers=2, ordered=False),
+                     key=lambda result: result.index)
+    assert [result.ok for result in results] == [True, True, False, True]
+    assert isinstance(results[2].error, ValueError)
+    assert results[2].traceback is not None and 'no twos' in results[2].traceback
+    assert results[3].html == '<p>3</p>'
+
+
+def test_render_many_async() -> None:
+    assert [result.html for result in render_many(async_item, [(1,), (2,)], workers=1)] == ['<li>1</li>', '<li>2</li>']
@@ -0,0 +1,165 @@
+from typing import Any, Iterator, List
+
+import pytest
+
+from generate_html import HTML, LRU, component, contents, fragment, render_html, tag
+from generate_html.caching import MISSING
+from generate_html.components import InvalidHTML
+
+
+def test_fragment_cache_hits_and_misses() -> None:
+    calls: List[Any] = []
+
+    @fragment(cache=LRU())
+    def badge(name: Any) -> Iterator:
+        calls.append(name)
+        yield tag.span(name, class_='badge')
+
+    assert render_html(badge('a<b')) == '<span class="badge">a&lt;b</span>'
+    assert render_html(badge('a<b')) == '<span class="badge">a&lt;b</span>'
+    assert render_html(badge(name='c')) == '<span class="badge">c</span>'
+    assert calls == ['a<b', 'c']
+    stats = badge.cache.stats()  # type: ignore
+    assert (stats.hits, stats.misses, stats.size) == (1, 2, 2)
+
+
+def test_cached_result_is_immutable() -> None:
+    @fragment(cache=LRU())
+    def price(amount: Any) -> Iterator:
+        yield tag.b(amount)
+
+    @fragment
+    def total() -> Iterator:
+        with tag.p():
+            yield price(3)
+            yield price(3)
+
+    assert type(price(3)) is HTML
+    assert render_html(total()) == '<p><b>3</b><b>3</b></p>'
+    with pytest.raises(AttributeError):
+        price(3).add('x')  # type: ignore
+    assert render_html(price(3)) == '<b>3</b>'
+
+
+def test_argument_types_are_part_of_the_key() -> None:
+    @fragment(cache=LRU())
+    def badge(value: Any) -> Iterator:
+        yield tag.span(value)
+
+    assert render_html(badge(1)) == '<span>1</span>'
+    assert render_html(badge(True)) == '<span>True</span>'
+    assert render_html(badge(1.0)) == '<span>1.0</span>'
+    assert render_html(badge(value=1)) == '<span>1</span>'
+    assert render_html(badge(value=True)) == '<span>True</span>'
+    assert badge.cache.stats().size == 5  # type: ignore
+
+
+def test_lru_eviction_and_ttl() -> None:
+    now = [0.0]
+    cache = LRU(maxsize=2, ttl=10, timer=lambda: now[0])
+    cache.set(1, 'one')
+    cache.set(2, 'two')
+    cache.get(1)
+    cache.set(3, 'three')
+    assert cache.get(2) is MISSING
+    assert cache.get(1) == 'one'
+    now[0] = 10.0
+    assert cache.get(1) is MISSING
+    assert cache.stats().size == 1
+
+
+def test_invalidate_and_clear() -> None:
+    calls: List[Any] = []
+
+    @fragment(cache=LRU())
+    def pager(page: Any, *, total: Any) -> Iterator:
+        calls.append(page)
+        yield tag.nav(f'{page}/{total}')
+
+    pager(1, total=5)
+    pager(1, total=5)
+    assert pager.cache.invalidate(1, total=5)  # type: ignore
+    assert not pager.cache.invalidate(1, total=5)  # type: ignore
+    pager(1, total=5)
+    pager.cache.clear()  # type: ignore
+    pager(1, total=5)
+    assert calls == [1, 1, 1]
+
+
+def test_unhashable_arguments_bypass_cache() -> None:
+    @fragment(cache=LRU())
+    def listing(items: Any) -> Iterator:
+        with tag.ul():
+            for item in items:
+                yield tag.li(item)
+
+    assert render_html(listing(['a'])) == '<ul><li>a</li></ul>'
+    assert render_html(listing(['b'])) == '<ul><li>b</li></ul>'
+    assert listing.cache.stats().size == 0  # type: ignore
+
+
+def test_compiled_fragment_cache() -> None:
+    @fragment(compiled=True, cache=LRU())
+    def tag_line(text: Any) -> Iterator:
+        yield tag.em(text)
+
+    assert render_html(tag_line('x')) == render_html(tag_line('x')) == '<em>x</em>'
+    assert tag_line.cache.stats().hits == 1  # type: ignore
+
+
+def card(title: Any) -> Iterator:
+    with tag.div(class_='card'):
+        yield tag.h2(title)
+        with tag.div(class_='body'):
+            yield contents()
+    yield tag.hr()
+
+
+cached_card = component(cache=LRU())(card)
+plain_card = component(card)
+
+
+def test_component_cache_with() -> None:
+    @fragment
+    def page(cached: bool) -> Iterator:
+        for title in ['a', 'b', 'a']:
+            with (cached_card if cached else plain_card)(title):
+                yield tag.p(title)
+
+    assert render_html(page(True)) == render_html(page(False))
+    stats = cached_card.cache.stats()  # type: ignore
+    assert stats.hits >= 1
+
+
+def test_component_cache_iter() -> None:
+    @component(cache=LRU())
+    def two_columns(label: Any) -> Iterator:
+        with tag.div(class_=label):
+            yield contents('left')
+            yield contents('right')
+
+    @fragment
+    def page() -> Iterator:
+        for _ in range(2):
+            for side in two_columns('cols'):
+                yield tag.span(side)
+
+    assert render_html(page()) == ('<div class="cols"><span>left</span><span>right</span></div>' * 2)
+    assert two_columns.cache.stats().hits == 1  # type: ignore
+
+    @fragment
+    def misuse() -> Iterator:
+        with two_columns('cols'):
+            pass
+        yield ''
+
+    with pytest.raises(InvalidHTML):
+        misuse()
+
+
+def test_async_component_cache_rejected() -> None:
+    async def f() -> Any:
+        yield contents()
+
+    with pytest.raises(TypeError):
+        component(cache=LRU())(f)
@@ -0,0 +1,110 @@
+from inspect import Signature, signature
+from typing import Any, Iterator, List
+
+import pytest
+
+from generate_html import HTML, document, fragment, render_html, tag
+
+
+@fragment
+def plain_card(title: Any, body: Any, *, level: Any = 'info') -> Iterator:
+    with tag.div(class_=['card'], data_level=level):
+        yield tag.h2(title)
+        yield body
+    yield tag.script(title)
+
+
+compiled_card = fragment(compiled=True)(plain_card.__wrapped__)  # type: ignore
+
+
+@fragment(compiled=True)
+def branching(items: List[str]) -> Iterator:
+    if items:
+        with tag.ul():
+            for item in items:
+                yield tag.li(item)
+
+
+@fragment(compiled=True)
+def uses_compiled(title: Any) -> Iterator:
+    with tag.section():
+        yield compiled_card(title, 'body')
+
+
+@document(compiled=True)
+def compiled_document(title: Any) -> Iterator:
+    with tag.html():
+        yield tag.title(title)
+
+
+@pytest.mark.parametrize('args, kwargs', [
+    (('<Hi>', 'text'), {}),
+    ((1, tag.em('x')), {'level': False}),
+    (('a', plain_card('b', 'c')), {'level': True}),
+    ((), {'title': HTML('<b>'), 'body': 'x', 'level': ['a', 'b']}),
+])
+def test_compiled_output(args: Any, kwargs: Any) -> None:
+    assert render_html(compiled_card(*args, **kwargs)) == render_html(plain_card(*args, **kwargs))
+    assert compiled_card.compiler.template is not None  # type: ignore
+
+
+def test_untraceable_falls_back() -> None:
+    assert render_html(branching(['a', '<b>'])) == '<ul><li>a</li><li>&lt;b&gt;</li></ul>'
+    assert render_html(branching([])) == ''
+    assert branching.compiler.traced  # type: ignore
+    assert branching.compiler.template is None  # type: ignore
+
+
+@fragment(compiled=True)
+def greet(name: Any = None) -> Iterator:
+    if name is None:
+        yield tag.p('anon')
+    else:
+        yield tag.p(name)
+
+
+@fragment(compiled=True)
+def describe(value: Any) -> Iterator:
+    yield tag.p(*[value if isinstance(value, str) else 'other' for _ in range(1)])
+
+
+def test_identity_checks_are_not_compiled() -> None:
+    assert render_html(greet()) == '<p>anon</p>'
+    assert render_html(greet('ann')) == '<p>ann</p>'
+    assert greet.compiler.template is None  # type: ignore
+    assert render_html(describe('a')) == '<p>a</p>'
+    assert render_html(describe(1)) == '<p>other</p>'
+    assert describe.compiler.template is None  # type: ignore
+
+
+def test_nested_compiled() -> None:
+    assert render_html(uses_compiled('<')) == (
+        '<section><div class="card" data-level="info"><h2>&lt;</h2>body</div><script><</script></section>')
+    assert uses_compiled.compiler.template is not None  # type: ignore
+
+
+def test_compiled_document() -> None:
+    assert render_html(compiled_document('T&C')) == '<!doctype html><html><title>T&amp;C</title></html>'
+
+
+def test_compiled_signature() -> None:
+    assert signature(compiled_document) == Signature(signature(compiled_document.__wrapped__).parameters.values(),  # type: ignore
+                                                     return_annotation=HTML)
+
+
+def test_compiled_errors() -> None:
+    with pytest.raises(TypeError):
+        compiled_card()
+
+
+def test_keyword_only_binding() -> None:
+    @fragment(compiled=True)
+    def labelled(text: Any, *, label: Any) -> Iterator:
+        yield tag.span(text, title=label)
+
+    assert render_html(labelled('a', label='b')) == '<span title="b">a</span>'
+    assert labelled.compiler.bind(('a',), {'label': 'b'}) == ['a', 'b']  # type: ignore
+    with pytest.raises(TypeError):
+        labelled('a', 'b')
+    with pytest.raises(TypeError):
+        compiled_card('a', 'b', 'c')
@@ -0,0 +1,181 @@
+import random
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+
+from generate_html import HTML, comment, fragment, render_html, tag
+from generate_html.diff import (InsertChild, MoveChild, RemoveAttribute, RemoveChild, Replace, SetAttribute,
+                                apply_patches, diff)
+
+
+@fragment
+def dashboard(stats: Dict[str, int], note: str = 'ok') -> Iterator:
+    with tag.table(id='stats'):
+        for name, value in stats.items():
+            with tag.tr(key=name):
+                yield tag.th(name)
+                yield tag.td(value, class_='hot' if value > 10 else 'cold')
+    yield tag.p(note)
+
+
+def check(old: Any, new: Any) -> List[Any]:
+    patches = diff(old, new)
+    assert apply_patches(old, patches) == apply_patches(new, [])
+    return patches
+
+
+def test_identical() -> None:
+    assert check(dashboard({'a': 1, 'b': 2}), dashboard({'a': 1, 'b': 2})) == []
+
+
+def test_cell_changes() -> None:
+    patches = check(dashboard({'a': 1, 'b': 2}), dashboard({'a': 1, 'b': 20}))
+    assert patches == [SetAttribute((0, 1, 1), 'class', 'hot'), Replace((0, 1, 1, 0), '20')]
+    assert patches[0].to_dict() == {'op': 'set_attribute', 'path': (0, 1, 1), 'name': 'class', 'value': 'hot'}
+
+
+def test_keyed_rows() -> None:
+    old = dashboard({'a': 1, 'b': 2, 'c': 3})
+    assert check(old, dashboard({'x': 9, 'a': 1, 'b': 2, 'c': 3})) == [
+        InsertChild((0,), 0, '<tr key="x"><th>x</th><td class="cold">9</td></tr>')]
+    assert check(old, dashboard({'a': 1, 'c': 3})) == [RemoveChild((0,), 1)]
+    assert check(old, dashboard({'c': 3, 'a': 1, 'b': 2})) == [MoveChild((0,), 2, 0)]
+
+
+def test_attributes_and_text() -> None:
+    old = tag.div(tag.input(disabled=True, value='a'), 'text', comment('c'))
+    new = tag.div(tag.input(value='b', required=True), 'other', comment('c'))
+    assert check(old, new) == [SetAttribute((0,), 'value', 'b'), SetAttribute((0,), 'required', ''),
+                               RemoveAttribute((0,), 'disabled'), Replace((1,), 'other')]
+    assert check(tag.div('a'), tag.span('a')) == [Replace((), '<span>a</span>')]
+    assert check(tag.a(title='x'), tag.a(title='"y"')) == [SetAttribute((), 'title', '"y"')]
+
+
+def test_duplicate_keys() -> None:
+    with pytest.raises(ValueError):
+        diff(tag.ul(tag.li(key=1), tag.li(key=1)), tag.ul())
+
+
+def test_random_lists() -> None:
+    rng = random.Random(42)
+    for _ in range(200):
+        old_keys = rng.sample(range(20), rng.randrange(10))
+        new_keys = rng.sample(range(20), rng.randrange(10))
+        old = tag.ul(*[tag.li(k, key=k) if k % 3 else tag.li(k) for k in old_keys])
+        new = tag.ul(*[tag.li(k * 2 if k % 5 == 0 else k, key=k) if k % 3 else tag.li(k) for k in new_keys])
+        check(old, new)
+
+
+class DOMParser(HTMLParser):
+    'Parses HTML into nested ``[tag, attributes, children]`` lists, with text as strings.'
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.stack: List[List[Any]] = [['#root', {}, []]]
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        element = [tag, {name: value or '' for name, value in attrs}, []]
+        self.stack[-1][2].append(element)
+        if tag not in {'br', 'hr', 'img', 'input', 'meta', 'link'}:
+            self.stack.append(element)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.stack[-1][0] == tag:
+            self.stack.pop()
+
+    def handle_data(self, data: str) -> None:
+        children = self.stack[-1][2]
+        if children and isinstance(children[-1], str):
+            children[-1] += data
+        else:
+            children.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        self.stack[-1][2].append(('#comment', data))
+
+
+def parse(html: str) -> List[Any]:
+    parser = DOMParser()
+    parser.feed(html)
+    parser.close()
+    return parser.stack[0][2]
+
+
+def normalized(node: Any) -> Any:
+    'Merge adjacent text, which is what comparing the HTML of two DOM trees would do.'
+    if not isinstance(node, list):
+        return node
+    children: List[Any] = []
+    for child in node[2]:
+        if children and isinstance(child, str) and isinstance(children[-1], str):
+            children[-1] += child
+        else:
+            children.append(normalized(child))
+    return [node[0], node[1], children]
+
+
+def check_dom(old: Any, new: Any) -> List[Any]:
+    'Apply the patches to a tree parsed from the old HTML, by ``childNodes`` index.'
+    patches = diff(old, new)
+    root: List[Any] = ['#root', {}, parse(render_html(old))]
+    for patch in patches:
+        if isinstance(patch, Replace) and not patch.path:
+            root[2] = parse(patch.html)
+            continue
+        node = root[2][0]
+        for index in patch.path[:-1] if isinstance(patch, Replace) else patch.path:
+            node = node[2][index]
+        if isinstance(patch, Replace):
+            node[2][patch.path[-1]:patch.path[-1] + 1] = parse(patch.html)
+        elif isinstance(patch, SetAttribute):
+            node[1][patch.name] = patch.value
+        elif isinstance(patch, RemoveAttribute):
+            del node[1][patch.name]
+        elif isinstance(patch, InsertChild):
+            node[2][patch.index:patch.index] = parse(patch.html)
+        elif isinstance(patch, RemoveChild):
+            del node[2][patch.index]
+        else:
+            node[2].insert(patch.to_index, node[2].pop(patch.from_index))
+    assert normalized(root) == normalized(['#root', {}, parse(render_html(new))])
+    return patches
+
+
+def test_child_nodes() -> None:
+    assert check_dom(tag.td(3, ' ', 'EUR', tag.b('x')), tag.td(4, ' ', 'EUR', tag.b('y'))) == [
+        Replace((0,), '4 EUR'), Replace((1, 0), 'y')]
+    assert check_dom(tag.p('', tag.b('x'), '', tag.i('y')), tag.p(tag.b('x'), tag.i('z'))) == [
+        Replace((1, 0), 'z')]
+    assert check_dom(tag.div(HTML('<i>a</i><i>b</i>'), tag.b('c')), tag.div(HTML('<i>a</i><i>b</i>'), tag.b('d'))) == [
+        Replace((2, 0), 'd')]
+    assert check_dom(tag.div('a', HTML('b<br>c'), tag.b('x')), tag.div('a', HTML('b<br>d'), tag.b('x'))) == [
+        Replace((2,), 'd')]
+    assert check_dom(tag.script('if (a < b) {}', ' f()'), tag.script('if (a < c) {}')) == [
+        Replace((0,), 'if (a < c) {}')]
+
+
+def test_random_child_nodes() -> None:
+    rng = random.Random(7)
+    pieces = ['', ' ', 'text', '1 < 2', HTML(''), HTML('<i>a</i>b'), HTML('c<!--d--><i>e<br></i>\n<hr>'),
+              HTML('</i>f'), comment('g')]
+
+    def children() -> List[Any]:
+        result: List[Any] = []
+        keys = rng.sample(range(12), 8)
+        for _ in range(rng.randrange(8)):
+            choice = rng.random()
+            if choice < 0.4:
+                result.append(rng.choice(pieces))
+            elif choice < 0.6:
+                result.append(tag.b(rng.choice(pieces)))
+            elif choice < 0.8:
+                result.append(tag.li(rng.choice(pieces), key=keys.pop()))
+            else:
+                result.append(fragment(lambda: iter([rng.choice(pieces), tag.b(rng.choice(pieces))]))())
+        return result
+
+    for _ in range(300):
+        old = tag.ul(*children())
+        new = tag.ul(*children())
+        check_dom(old, new)
@@ -0,0 +1,109 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Iterator, List
+
+from generate_html import document, fragment, render_html, tag
+from generate_html.fragment_cache import DictStore, FragmentCache, SQLiteStore
+
+
+def make_page(cached: FragmentCache, calls: List[str], prices: dict) -> Any:
+    @fragment
+    def price_tag(product: int) -> Iterator:
+        calls.append(f'price {product}')
+        yield tag.span(prices[product], class_='price')
+
+    @fragment
+    def details(product: int) -> Iterator:
+        calls.append(f'details {product}')
+        with tag.div():
+            yield tag.h1(f'Product {product}')
+            yield cached(('price', product), price_tag, product)
+
+    @fragment
+    def sidebar() -> Iterator:
+        calls.append('sidebar')
+        yield tag.aside('<links>')
+
+    @document
+    def page(product: int) -> Iterator:
+        with tag.body():
+            yield cached(('details', product), details, product)
+            yield cached('sidebar', sidebar)
+    return page
+
+
+def check_nested_invalidation(cached: FragmentCache) -> None:
+    calls: List[str] = []
+    prices = {1: '€1', 2: '€2'}
+    page = make_page(cached, calls, prices)
+    first = render_html(page(1))
+    assert '<span class="price">€1</span>' in first
+    assert '<aside>&lt;links&gt;</aside>' in first
+    assert calls == ['details 1', 'price 1', 'sidebar']
+
+    calls.clear()
+    assert render_html(page(1)) == first
+    assert calls == []
+
+    prices[1] = '€3'
+    cached.invalidate(('price', 1))
+    assert '<span class="price">€3</span>' in render_html(page(1))
+    assert calls == ['details 1', 'price 1']
+
+    calls.clear()
+    render_html(page(2))
+    cached.invalidate('sidebar')
+    render_html(page(2))
+    assert calls == ['details 2', 'price 2', 'sidebar']
+
+
+def test_dict_store() -> None:
+    check_nested_invalidation(FragmentCache(DictStore()))
+
+
+def test_sqlite_store(tmp_path: Path) -> None:
+    path = tmp_path / 'fragments.sqlite'
+    check_nested_invalidation(FragmentCache(SQLiteStore(path)))
+    shared = FragmentCache(SQLiteStore(path))
+    assert render_html(shared('sidebar', lambda: 'not rebuilt')) == '<aside>&lt;links&gt;</aside>'
+
+
+def test_depends_on() -> None:
+    cached = FragmentCache(DictStore())
+    names = {'user': 'Ann'}
+
+    def greeting() -> str:
+        return f'Hello {names["user"]}'
+
+    assert render_html(cached('greeting', greeting, depends_on=['user/1'])) == 'Hello Ann'
+    names['user'] = 'Bob'
+    assert render_html(cached('greeting', greeting, depends_on=['user/1'])) == 'Hello Ann'
+    cached.invalidate('user/1')
+    assert render_html(cached('greeting', greeting, depends_on=['user/1'])) == 'Hello Bob'
+
+
+def test_keys_are_distinct() -> None:
+    cached = FragmentCache(DictStore())
+    assert render_html(cached('a/b', lambda: 'string')) == 'string'
+    assert render_html(cached(('a/b',), lambda: 'one part')) == 'one part'
+    assert render_html(cached(('a', 'b'), lambda: 'two parts')) == 'two parts'
+    assert render_html(cached(('a', 1), lambda: 'number')) == 'number'
+    assert render_html(cached(('a', '1'), lambda: 'digit')) == 'digit'
+
+
+def test_dict_store_size() -> None:
+    store = DictStore(maxsize=2)
+    cached = FragmentCache(store)
+    cached.invalidate('x')
+    for key in 'abc':
+        cached(key, lambda: key)
+    assert render_html(cached('a', lambda: 'rebuilt')) == 'rebuilt'
+    assert len(store.entries) == 2
+    assert len(store.versions) == 1
+
+
+def test_optional_modules_are_imported_when_used() -> None:
+    code = 'import sys, generate_html; print(sorted({"sqlite3", "asyncio"} & set(sys.modules)))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,44 @@
+from typing import Iterator, cast
+
+from generate_html import fragment, render_html, tag
+from generate_html.nodes import Node
+
+
+@fragment
+def navbar() -> Iterator:
+    with tag.nav(class_='top'):
+        yield tag.a('Home', href='/')
+
+
+NAVBAR = cast(Node, navbar()).freeze()
+
+
+@fragment
+def page(title: str) -> Iterator:
+    yield NAVBAR
+    yield tag.h1(title)
+
+
+def test_freeze_caches() -> None:
+    assert NAVBAR.frozen
+    assert render_html(NAVBAR) == '<nav class="top"><a href="/">Home</a></nav>'
+
+
+def test_frozen_fragment_is_embedded() -> None:
+    result = page('<Hi>')
+    assert isinstance(result, Node)
+    assert NAVBAR in result.children
+    assert render_html(result) == '<nav class="top"><a href="/">Home</a></nav><h1>&lt;Hi&gt;</h1>'
+
+
+def test_frozen_node_uses_cache() -> None:
+    element = tag.p('before').freeze()
+    element.children.append(tag.br())
+    assert render_html(element) == '<p>before</p>'
+
+
+def test_add_invalidates() -> None:
+    element = tag.p('before').freeze()
+    element.add('after')
+    assert not element.frozen
+    assert render_html(element) == '<p>beforeafter</p>'
@@ -1,4 +1,5 @@
-from generate_html import HTML, fragment, render_html, tag
+from generate_html import HTML, escape, fragment, render_html, tag
+from generate_html.html import set_escape_cache_size
 from typing import Iterator
 
 
@@ -9,3 +10,20 @@ def simple_fragment() -> Iterator:
 
 def test_html_repr() -> None:
     assert repr(HTML('ok')) == "HTML('ok')"
+
+
+def test_escape() -> None:
+    assert escape('plain') == 'plain'
+    assert escape('<a href="x">&\'</a>') == '&lt;a href=&quot;x&quot;&gt;&amp;&#x27;&lt;/a&gt;'
+    assert escape(42) == '42'
+    assert escape(1.5) == '1.5'
+    assert escape(True) == 'True'
+
+
+def test_escape_cache_size() -> None:
+    try:
+        set_escape_cache_size(0)
+        assert escape('a & b') == 'a &amp; b'
+    finally:
+        set_escape_cache_size(1024)
+    assert escape('a & b') == 'a &amp; b'
@@ -0,0 +1,99 @@
+import asyncio
+from decimal import Decimal
+from typing import Any, AsyncIterator, Iterator
+
+from generate_html import HTML, comment, component, contents, document, fragment, interning, render_html, tag
+from generate_html.context import get_stack
+from generate_html.interning import Interner
+from generate_html.nodes import Node
+
+
+@fragment
+def badge(text: Any) -> Iterator:
+    yield tag.span(text, class_='badge')
+
+
+@component
+def cell() -> Iterator:
+    with tag.td(class_='cell'):
+        yield contents()
+
+
+@document
+def catalog(count: int) -> Iterator:
+    with tag.table():
+        for i in range(count):
+            with tag.tr():
+                with cell():
+                    yield badge('new')
+                with cell():
+                    yield badge(i % 3)
+                yield tag.td(comment('empty'))
+                yield tag.td(tag.i(class_='icon', data_x=[1, 2]))
+
+
+def rows(page: Any) -> Any:
+    return page.children[0].children
+
+
+def test_interning_shares_identical_subtrees() -> None:
+    expected = render_html(catalog(9))
+    with interning() as interner:
+        page = catalog(9)
+    assert get_stack().interner is None
+    assert render_html(page) == expected
+    first, second, third, fourth = rows(page)[:4]
+    assert first is not second
+    assert first is fourth
+    assert first.children[0] is second.children[0]
+    assert first.children[3] is second.children[3]
+    assert first.frozen and first.children[2].frozen
+    assert interner.hits > 0
+
+
+def test_values_that_compare_equal() -> None:
+    @fragment
+    def flags() -> Iterator:
+        yield tag.input(data_a=True)
+        yield tag.input(data_a=1)
+        yield tag.input(data_a=[1])
+        yield tag.input(data_a=[True])
+        yield tag.input(data_a=[1.0])
+        yield tag.input(data_a=Decimal('1'))
+        yield tag.input(data_a=Decimal('1.00'))
+
+    expected = render_html(flags())
+    assert expected == ('<input data-a><input data-a="1"><input data-a="1"><input data-a="True">'
+                        '<input data-a="1.0"><input data-a="1"><input data-a="1.00">')
+    with interning():
+        assert render_html(flags()) == expected
+
+
+def test_unhashable_attributes() -> None:
+    @fragment
+    def page() -> Iterator:
+        yield tag.div(data_x={'a': 1})
+        yield tag.div(data_x={'a': 1})
+
+    with interning():
+        result = page()
+    assert isinstance(result, Node)
+    assert result.children[0] is result.children[1]
+    assert render_html(result) == '<div data-x="{&#x27;a&#x27;: 1}"></div>' * 2
+
+
+def test_shared_interner_and_async() -> None:
+    @fragment
+    async def later() -> AsyncIterator:
+        await asyncio.sleep(0)
+        yield tag.hr()
+
+    interner = Interner()
+    with interning(interner):
+        a: HTML = asyncio.run(later())
+    with interning(interner):
+        b = badge('x')
+        c: HTML = asyncio.run(later())
+    assert isinstance(a, Node) and isinstance(c, Node)
+    assert a.children[0] is c.children[0]
+    assert render_html(b) == '<span class="badge">x</span>'
@@ -0,0 +1,84 @@
+from typing import Any, Iterator, List
+
+import pytest
+
+from generate_html import component, contents, fragment, iter_html, lazy, render_html, tag
+
+
+def test_generator_consumed_while_serializing() -> None:
+    produced: List[int] = []
+
+    def rows() -> Iterator:
+        for i in range(3):
+            produced.append(i)
+            yield tag.tr(tag.td(f'<{i}>'))
+
+    @fragment
+    def table() -> Iterator:
+        with tag.table():
+            yield lazy(rows())
+
+    result = table()
+    assert produced == []
+    assert render_html(result) == ('<table><tr><td>&lt;0&gt;</td></tr><tr><td>&lt;1&gt;</td></tr>'
+                                   '<tr><td>&lt;2&gt;</td></tr></table>')
+    assert produced == [0, 1, 2]
+
+
+def test_streaming_is_incremental() -> None:
+    produced: List[int] = []
+
+    def rows() -> Iterator:
+        for i in range(1000):
+            produced.append(i)
+            yield tag.tr(tag.td(i))
+
+    chunks = iter_html(tag.table(lazy(rows())), chunk_size=1000)
+    next(chunks)
+    assert 0 < len(produced) < 1000
+    list(chunks)
+    assert len(produced) == 1000
+
+
+def test_callable_and_escaping() -> None:
+    calls: List[int] = []
+
+    def source() -> Any:
+        calls.append(1)
+        return ['a<b', 1, tag.b('c')]
+
+    element = tag.p(lazy(source), lazy(lambda: 'x&y'))
+    assert render_html(element) == '<p>a&lt;b1<b>c</b>x&amp;y</p>'
+    assert render_html(element) == '<p>a&lt;b1<b>c</b>x&amp;y</p>'
+    assert len(calls) == 2
+
+
+def test_raw_text() -> None:
+    assert render_html(tag.script(lazy(['a < b', ' && c']))) == '<script>a < b && c</script>'
+
+    @fragment
+    def style() -> Iterator:
+        with tag.style():
+            yield lazy(lambda: 'p > a {}')
+
+    assert render_html(style()) == '<style>p > a {}</style>'
+
+
+def test_lazy_misuse() -> None:
+    @component
+    def box() -> Iterator:
+        yield contents()
+
+    with pytest.raises(TypeError):
+        render_html(tag.div(lazy([box()])))
+    with pytest.raises(TypeError):
+        lazy([]).add('x')
+
+
+def test_compiled_fragment_with_lazy_children() -> None:
+    @fragment(compiled=True)
+    def numbers(count: Any) -> Iterator:
+        yield tag.ul(lazy(lambda: (tag.li(i) for i in range(2))))
+
+    assert render_html(numbers(1)) == '<ul><li>0</li><li>1</li></ul>'
+    assert numbers.compiler.template is None  # type: ignore
@@ -0,0 +1,63 @@
+from typing import Iterator
+
+from generate_html import HTML, comment, document, fragment, iter_html, render_html, tag
+
+
+@document
+def page() -> Iterator:
+    with tag.html(lang='en'):
+        with tag.head():
+            yield tag.title('a < b')
+        with tag.body():
+            with tag.ul():
+                yield tag.li('one')
+                yield tag.li('two')
+            yield tag.p('text')
+            yield tag.div(tag.p('last'))
+            with tag.a(href='/'):
+                yield tag.p('kept')
+
+
+def test_document() -> None:
+    assert render_html(page(), minify=True) == (
+        '<!doctype html><html lang=en><head><title>a &lt; b</title><body><ul><li>one<li>two</ul>'
+        '<p>text<div><p>last</div><a href=/><p>kept</p></a>')
+    assert ''.join(iter_html(page(), minify=True)) == render_html(page(), minify=True)
+
+
+def test_attributes() -> None:
+    element = tag.input(value='', name='q', placeholder='say "hi"', class_=['a', 'b'], disabled=True,
+                        hidden=False, data_x='a=b', data_y='it\'s')
+    assert render_html(element, minify=True) == (
+        '<input value name=q placeholder="say &quot;hi&quot;" class="a b" disabled data-x="a=b" '
+        'data-y=it&#x27;s>')
+
+
+def test_tables_and_selects() -> None:
+    table = tag.table(tag.thead(tag.tr(tag.th('h'))), tag.tbody(tag.tr(tag.td(1), tag.td(2)), tag.tr(tag.td(3))))
+    assert render_html(table, minify=True) == '<table><thead><tr><th>h<tbody><tr><td>1<td>2<tr><td>3</table>'
+    select = tag.select(tag.optgroup(tag.option('a'), tag.option('b')), tag.option('c'))
+    assert render_html(select, minify=True) == (
+        '<select><optgroup><option>a<option>b</optgroup><option>c</select>')
+
+
+def test_unknown_context_and_separators() -> None:
+    @fragment
+    def items() -> Iterator:
+        yield tag.li('a')
+        yield ''
+        yield tag.li('b')
+
+    assert render_html(items(), minify=True) == '<li>a<li>b</li>'
+    # text or comments between siblings keep the end tag
+    assert render_html(tag.ul(tag.li('a'), ' ', tag.li('b')), minify=True) == '<ul><li>a</li> <li>b</ul>'
+    assert render_html(tag.dl(tag.dt('a'), comment('x'), tag.dd('b')), minify=True) == (
+        '<dl><dt>a</dt><!-- x --><dd>b</dl>')
+    assert render_html(tag.ul(tag.li('a'), HTML('<li>b</li>')), minify=True) == '<ul><li>a</li><li>b</li></ul>'
+
+
+def test_text_elements_untouched() -> None:
+    assert render_html(tag.script(tag.p('x'), ' && y'), minify=True) == '<script><p>x</p> && y</script>'
+    assert render_html(tag.div(tag.textarea('<li>'), tag.style('a>b{}')), minify=True) == (
+        '<div><textarea>&lt;li&gt;</textarea><style>a>b{}</style></div>')
+    assert render_html(comment(tag.p('x')), minify=True) == '<!-- <p>x</p> -->'
@@ -0,0 +1,71 @@
+from generate_html import HTML, render_html, tag
+from generate_html.nodes import (CommentNode, Element, ElementCollection,
+                                 child_html)
+
+
+def test_deep_tree() -> None:
+    depth = 20_000
+    root = innermost = Element([], 'b', {})
+    for _ in range(depth - 1):
+        child = Element([], 'b', {})
+        innermost.children.append(child)
+        innermost = child
+    innermost.children.append(Element([], 'br', {}))
+    assert render_html(root) == '<b>' * depth + '<br>' + '</b>' * depth
+
+
+def test_start_tag() -> None:
+    element = Element([], 'td', {'class_': ['a', 'b'], 'data_id': 3, 'hidden': True, 'lang': False})
+    assert element.start_html() == '<td class="a b" data-id="3" hidden>'
+    assert element.start_html() is element.start_html()
+    assert render_html(element) == '<td class="a b" data-id="3" hidden></td>'
+
+
+def test_compact_layout() -> None:
+    element = Element([HTML('x')], 'p', {})
+    assert not hasattr(element, '__dict__')
+    assert not hasattr(element.children[0], '__dict__')
+
+
+def test_attributes() -> None:
+    element = Element([], 'p', {})
+    assert element.attributes == {}
+    element.attributes['id'] = 'x'
+    assert render_html(element) == '<p id="x"></p>'
+    element.attributes = {'id': 'y'}
+    assert render_html(element) == '<p id="y"></p>'
+    element.freeze()
+    element.attributes['id'] = 'z'
+    assert render_html(element) == '<p id="z"></p>'
+    assert render_html(element, minify=True) == '<p id=z></p>'
+
+
+def test_equality() -> None:
+    assert Element([], 'p', {}) == Element([], 'p', {})
+    assert Element([], 'p', {}) != Element([], 'p', {'id': 'x'})
+    assert ElementCollection([]) == ElementCollection([])
+    assert ElementCollection([]) != CommentNode([])
+
+
+def test_add_dispatch() -> None:
+    class Markup(HTML):
+        pass
+
+    root = ElementCollection([])
+    script = Element([], 'script', {})
+    for item in ['<a>', HTML('<b>'), Markup('<c>'), 3, Element([], 'i', {}), ElementCollection([HTML('<d>')]),
+                 CommentNode([HTML('e')])]:
+        root.add(item)
+        script.add(item if isinstance(item, HTML) else str(item))
+    assert render_html(root) == '&lt;a&gt;<b><c>3<i></i><d><!-- e -->'
+    assert render_html(script) == '<script><a><b><c>3<i></i><d><!-- e --></script>'
+
+
+def test_text_children_are_strings() -> None:
+    element = tag.p('<a>', 1, HTML('<br>'), tag.script('<b>'))
+    element.add('&')
+    assert element.children[:2] == ['&lt;a&gt;', '1']
+    assert element.children[-1] == '&amp;'
+    assert element.children[3].children == ['<b>']  # type: ignore
+    assert [child_html(child) for child in element.children[1:3]] == ['1', '<br>']
+    assert render_html(element) == '<p>&lt;a&gt;1<br><script><b></script>&amp;</p>'
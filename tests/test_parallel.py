@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Iterator, Optional
+
+import pytest
+
+from generate_html import document, fragment, parallel, render_html, tag
+
+user: ContextVar[str] = ContextVar('user', default='nobody')
+
+
+@fragment
+def section(name: str, barrier: Optional[threading.Barrier] = None) -> Iterator:
+    with tag.section(id=name):
+        if barrier is not None:
+            # only passes when the sections are built at the same time
+            barrier.wait()
+        yield tag.h2(name)
+        yield tag.p(user.get())
+        yield threading.current_thread().name.startswith('generate_html')
+
+
+@fragment
+def failing(message: str) -> Iterator:
+    yield tag.p()
+    raise ValueError(message)
+
+
+@document
+def page() -> Iterator:
+    user.set('ann')
+    with tag.body():
+        yield tag.header()
+        barrier = threading.Barrier(2, timeout=5)
+        yield parallel(partial(section, 'a', barrier), partial(section, 'b', barrier), lambda: 'text')
+        yield tag.footer()
+
+
+def test_parallel_in_document_order() -> None:
+    html = render_html(page())
+    assert html == ('<!doctype html><body><header></header><section id="a"><h2>a</h2><p>ann</p>True</section>'
+                    '<section id="b"><h2>b</h2><p>ann</p>True</section>text<footer></footer></body>')
+
+
+def test_first_exception_in_argument_order() -> None:
+    @fragment
+    def broken() -> Iterator:
+        yield parallel(partial(section, 'a'), partial(failing, 'first'), partial(failing, 'second'))
+
+    for _ in range(5):
+        with pytest.raises(ValueError, match='first'):
+            broken()
+
+
+def test_nested_and_custom_executor() -> None:
+    def outer(name: str) -> Any:
+        return parallel(partial(section, name + '1'), partial(section, name + '2'))
+
+    with ThreadPoolExecutor(2) as executor:
+        result = parallel(partial(outer, 'x'), partial(outer, 'y'), executor=executor)
+    assert [child.attributes['id'] for child in result.children] == ['x1', 'x2', 'y1', 'y2']  # type: ignore
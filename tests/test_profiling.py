@@ -0,0 +1,114 @@
+import asyncio
+import inspect
+import io
+import json
+import sys
+from typing import Any, AsyncIterator, Iterator, List
+
+from generate_html import component, contents, document, fragment, render_html, tag
+from generate_html.profiling import Event, Profiler, current_profiler
+
+
+@fragment
+def item(text: Any) -> Iterator:
+    yield tag.li(text)
+
+
+@component
+def card(title: Any) -> Iterator:
+    with tag.div(class_='card'):
+        yield tag.h2(title)
+        yield contents()
+
+
+@document
+def page(items: List[str]) -> Iterator:
+    with tag.body():
+        with card('Items'):
+            with tag.ul():
+                for text in items:
+                    yield item(text)
+
+
+def stats_by_name(profiler: Profiler) -> dict:
+    return {stats.name.rsplit('.', 1)[-1]: stats for stats in profiler.stats.values()}
+
+
+def test_inactive_by_default() -> None:
+    assert current_profiler.get() is None
+    assert render_html(page(['a'])).startswith('<!doctype html>')
+
+
+def test_records_constructions() -> None:
+    with Profiler() as profiler:
+        html = render_html(page(['a', 'b', 'é']))
+    assert current_profiler.get() is None
+    stats = stats_by_name(profiler)
+    assert stats['item'].calls == 3
+    assert stats['item'].kind == 'fragment'
+    assert stats['item'].nodes == 3
+    assert stats['item'].bytes == len('<li>a</li><li>b</li><li>é</li>'.encode())
+    assert stats['page'].kind == 'document'
+    assert stats['page'].bytes == len(html.encode())
+    assert stats['page'].self_time <= stats['page'].total_time
+    assert stats['card'].kind == 'component'
+    assert stats['card'].calls == 1
+    assert stats['card'].bytes == len('<h2>Items</h2>')
+    report = profiler.report()
+    assert 'item (fragment)' in report and 'page (document)' in report
+
+
+@fragment
+def nested(depth: int) -> Iterator:
+    if depth:
+        with tag.div():
+            yield nested(depth - 1)
+
+
+def test_no_extra_nesting() -> None:
+    # constructing a fragment takes three frames, with or without a profiler
+    depth = (sys.getrecursionlimit() - len(inspect.stack())) // 3 - 10
+    nested(depth)
+    with Profiler() as profiler:
+        nested(depth)
+    assert stats_by_name(profiler)['nested'].calls == depth + 1
+
+
+def test_output_unchanged_by_measuring() -> None:
+    with Profiler():
+        result: Any = item('a')
+    result.children[0].attributes['id'] = 'b'
+    assert render_html(result) == '<li id="b">a</li>'
+
+
+def test_callback_and_chrome_trace() -> None:
+    events: List[Event] = []
+    with Profiler(callback=events.append, trace=True) as profiler:
+        page(['a'])
+    assert [event.kind for event in events] == ['component', 'fragment', 'component', 'document']
+    file = io.StringIO()
+    profiler.write_chrome_trace(file)
+    trace = json.loads(file.getvalue())
+    assert len(trace['traceEvents']) == 4
+    assert {event['ph'] for event in trace['traceEvents']} == {'X'}
+
+
+def test_compiled_and_async() -> None:
+    @fragment(compiled=True)
+    def compiled(text: Any) -> Iterator:
+        yield tag.b(text)
+
+    @fragment
+    async def later(text: Any) -> AsyncIterator:
+        await asyncio.sleep(0)
+        yield tag.i(text)
+
+    with Profiler() as profiler:
+        compiled('x')
+        compiled('y')
+        asyncio.run(later('z'))
+    stats = stats_by_name(profiler)
+    assert compiled.compiler.template is not None  # type: ignore
+    assert stats['compiled'].calls == 2
+    assert stats['compiled'].bytes == len('<b>x</b><b>y</b>')
+    assert stats['later'].nodes == 1
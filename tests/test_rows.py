@@ -0,0 +1,75 @@
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from generate_html import fragment, iter_html, render_html, table_rows, tag
+
+
+def product_row(name: Any, price: Any, *, currency: Any = '€') -> Iterator:
+    with tag.tr(data_name=name):
+        yield tag.td(name)
+        yield tag.td(price, ' ', currency, class_='price')
+
+
+@fragment
+def decorated_row(cells: Any) -> Iterator:
+    with tag.tr():
+        for cell in cells:
+            yield tag.td(cell)
+
+
+@fragment
+def product_table(products: Any) -> Iterator:
+    with tag.table():
+        for name, price in products:
+            yield from product_row(name, price)
+
+
+PRODUCTS = [('Widget', 3), ('<Gadget>', 5.5)]
+EXPECTED = ('<tr data-name="Widget"><td>Widget</td><td class="price">3 €</td></tr>'
+            '<tr data-name="&lt;Gadget&gt;"><td>&lt;Gadget&gt;</td><td class="price">5.5 €</td></tr>')
+
+
+def test_records() -> None:
+    rows = table_rows(product_row, PRODUCTS)
+    assert render_html(rows) == EXPECTED
+    assert render_html(rows) == EXPECTED
+    assert render_html(table_rows(product_row, [list(product) for product in PRODUCTS])) == EXPECTED
+
+
+def test_mapping_records() -> None:
+    records = [{'name': 'Widget', 'price': 3, 'currency': '$'}]
+    assert render_html(table_rows(product_row, records)) == (
+        '<tr data-name="Widget"><td>Widget</td><td class="price">3 $</td></tr>')
+
+
+def test_columns() -> None:
+    assert render_html(table_rows(product_row, columns=[['Widget', '<Gadget>'], [3, 5.5]])) == EXPECTED
+    assert render_html(table_rows(product_row, columns={'price': (3, 5.5), 'name': ('Widget', '<Gadget>')})) == EXPECTED
+    columns: Dict[str, List[Any]] = {'name': ['Widget'], 'price': [3], 'currency': ['$']}
+    assert render_html(table_rows(product_row, columns=columns)) == (
+        '<tr data-name="Widget"><td>Widget</td><td class="price">3 $</td></tr>')
+
+
+def test_untraceable_row() -> None:
+    assert render_html(table_rows(decorated_row, [([1, 2],), ([],)])) == '<tr><td>1</td><td>2</td></tr><tr></tr>'
+
+
+def test_in_table() -> None:
+    with_rows = tag.table(table_rows(product_row, PRODUCTS))
+    assert render_html(with_rows) == render_html(product_table(PRODUCTS))
+
+
+def test_arguments() -> None:
+    with pytest.raises(TypeError):
+        table_rows(product_row)
+    with pytest.raises(TypeError):
+        render_html(table_rows(product_row, [('too', 'many', 'args')]))
+
+
+def test_streaming() -> None:
+    records = (('Widget', i) for i in range(10_000))
+    chunks = list(iter_html(tag.table(table_rows(product_row, records)), chunk_size=1000))
+    assert len(chunks) > 100
+    assert max(len(chunk) for chunk in chunks) < 1100
+    assert ''.join(chunks).count('<tr') == 10_000
@@ -0,0 +1,66 @@
+import mmap
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from generate_html import HTML, comment, document, fragment, lazy, render_html, tag
+from generate_html.diff import diff
+from generate_html.nodes import Element
+from generate_html.serialization import dumps, load, loads
+
+
+@document
+def page() -> Iterator:
+    with tag.html(lang='en'):
+        with tag.body(class_=['a', 'b'], data_count=3, data_ratio=1.5, hidden=True, title=None):
+            yield comment('<note>')
+            yield tag.p('<x> & é', HTML('<br>'), 7)
+            yield tag.script('if (a < b) {}')
+            yield tag.nav(tag.a('home', href='/')).freeze()
+            for i in range(3):
+                yield tag.td(i, key=i)
+
+
+def test_round_trip() -> None:
+    original = page()
+    loaded = loads(dumps(original))
+    assert render_html(loaded) == render_html(original)
+    assert diff(original, loaded) == []
+    body = loaded.children[0].children[0]  # type: ignore
+    assert body.attributes == {'class_': ['a', 'b'], 'data_count': 3, 'data_ratio': 1.5, 'hidden': True,
+                               'title': None}
+    text, br, number = body.children[1].children
+    assert (text, br.value, number) == ('&lt;x&gt; &amp; é', '<br>', '7')
+    assert body.children[3].frozen
+    loaded.children[0].add(tag.footer())  # type: ignore
+    assert render_html(loaded).endswith('</body><footer></footer></html>')
+
+
+def test_other_values() -> None:
+    @fragment
+    def parts() -> Iterator:
+        yield 'a'
+        yield tag.b()
+
+    assert render_html(loads(dumps(parts()))) == 'a<b></b>'
+    assert render_html(loads(dumps('<'))) == '&lt;'
+    assert render_html(loads(dumps(HTML('<hr>')))) == '<hr>'
+    assert isinstance(loads(dumps(tag.p())), Element)
+    with pytest.raises(TypeError):
+        dumps(tag.p(lazy(['x'])))
+
+
+def test_load_from_file(tmp_path: Path) -> None:
+    path = tmp_path / 'page.bin'
+    path.write_bytes(dumps(page()))
+    assert render_html(load(path)) == render_html(page())
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert render_html(loads(mapped)) == render_html(page())
+
+
+def test_invalid_data() -> None:
+    data = dumps(page())
+    for bad in [b'', b'\0' * 32, data[:-3], data[:40], data[:12] + b'\xff' * (len(data) - 12)]:
+        with pytest.raises(ValueError):
+            loads(bad)
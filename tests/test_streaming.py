@@ -0,0 +1,102 @@
+import gzip
+import io
+import os
+import zlib
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from generate_html import HTML, fragment, iter_gzip, iter_html, render_bytes, render_html, render_to, tag
+
+
+@fragment
+def long_list(n: int) -> Iterator:
+    with tag.ul():
+        for i in range(n):
+            yield tag.li(i)
+
+
+def test_iter_html_matches_render_html() -> None:
+    assert ''.join(iter_html(long_list(100), chunk_size=50)) == render_html(long_list(100))
+
+
+def test_iter_html_coalesces() -> None:
+    chunks = list(iter_html(long_list(100), chunk_size=50))
+    assert all(len(chunk) >= 50 for chunk in chunks[:-1])
+    assert 1 < len(chunks) < 40
+
+
+def test_iter_html_simple_values() -> None:
+    assert list(iter_html('<3')) == ['&lt;3']
+    assert list(iter_html(HTML('<br>'))) == ['<br>']
+    assert list(iter_html(HTML(''))) == []
+
+
+def test_iter_html_chunk_size() -> None:
+    with pytest.raises(ValueError):
+        list(iter_html('x', chunk_size=0))
+
+
+def test_iter_html_first_chunk() -> None:
+    chunks = list(iter_html(long_list(100), chunk_size=500, first_chunk_size=10))
+    assert 10 <= len(chunks[0]) < 20
+    assert all(len(chunk) >= 500 for chunk in chunks[1:-1])
+
+
+def test_render_bytes() -> None:
+    thing = long_list(100)
+    assert render_bytes(thing) == render_html(thing).encode()
+    assert render_bytes('ünïcode <3', 'latin-1') == 'ünïcode &lt;3'.encode('latin-1')
+
+
+def test_render_to_file_object() -> None:
+    output = io.BytesIO()
+    assert render_to(long_list(1000), output, buffer_size=100) == len(output.getvalue())
+    assert output.getvalue() == render_bytes(long_list(1000))
+
+
+def test_render_to_fd(tmp_path: Path) -> None:
+    path = tmp_path / 'out.html'
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        render_to(long_list(1000), fd, buffer_size=1000)
+    finally:
+        os.close(fd)
+    assert path.read_bytes() == render_bytes(long_list(1000))
+
+
+def test_render_to_partial_writes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    writev = os.writev
+    monkeypatch.setattr(os, 'writev', lambda fd, buffers: writev(fd, [bytes(b''.join(buffers)[:7])]))
+    path = tmp_path / 'out.html'
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        render_to(long_list(100), fd, buffer_size=100)
+    finally:
+        os.close(fd)
+    assert path.read_bytes() == render_bytes(long_list(100))
+
+
+def test_iter_gzip() -> None:
+    expected = render_html(long_list(5000)).encode()
+    for flush in ['none', 'first', 'sync']:
+        chunks = list(iter_gzip(long_list(5000), level=1, chunk_size=1000, flush=flush))
+        assert gzip.decompress(b''.join(chunks)) == expected
+        assert all(chunks)
+    with pytest.raises(ValueError):
+        list(iter_gzip('x', flush='always'))
+
+
+def test_iter_gzip_first_flush() -> None:
+    chunks = iter_gzip(long_list(5000), chunk_size=100_000, first_chunk_size=50)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # the first chunk is complete without waiting for the rest of the page
+    assert decompressor.decompress(next(chunks)).startswith(b'<ul><li>0</li>')
+
+
+def test_iter_html_small_chunks() -> None:
+    chunks = list(iter_html(long_list(100), chunk_size=10, first_chunk_size=200))
+    assert 200 <= len(chunks[0]) < 220
+    assert all(10 <= len(chunk) < 20 for chunk in chunks[1:-1])
+    assert ''.join(chunks) == render_html(long_list(100))
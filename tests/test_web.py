@@ -0,0 +1,120 @@
+import asyncio
+import gzip
+import threading
+from http.client import HTTPConnection
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, MutableMapping, Tuple
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+from wsgiref.util import setup_testing_defaults
+from wsgiref.validate import validator
+
+from generate_html import document, render_html, tag
+from generate_html.web import asgi_response, wsgi_response
+
+
+@document
+def big_page(rows: int) -> Iterator:
+    with tag.html():
+        with tag.body():
+            with tag.table():
+                for row in range(rows):
+                    yield tag.tr(tag.td(row), tag.td('<cell>'))
+
+
+@document
+async def async_page(rows: int) -> AsyncIterator:
+    with tag.html():
+        await asyncio.sleep(0)
+        for row in range(rows):
+            yield tag.p(row)
+
+
+def wsgi_app(environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+    return wsgi_response(big_page(500), start_response, chunk_size=1000, first_chunk_size=100,
+                         headers=[('X-Test', 'yes')])
+
+
+def run_asgi(app: Callable) -> List[MutableMapping[str, Any]]:
+    messages: List[MutableMapping[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: MutableMapping[str, Any]) -> None:
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': []}
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def test_wsgi_validates() -> None:
+    environ: Dict[str, Any] = {'QUERY_STRING': ''}
+    setup_testing_defaults(environ)
+    statuses = []
+
+    def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Callable[[bytes], object]:
+        statuses.append((status, headers))
+        return lambda data: None
+    result = validator(wsgi_app)(environ, start_response)
+    try:
+        chunks = list(result)
+    finally:
+        result.close()  # type: ignore
+    assert statuses == [('200 OK', [('Content-Type', 'text/html; charset=utf-8'), ('X-Test', 'yes')])]
+    assert 100 <= len(chunks[0]) < 1000
+    assert b''.join(chunks).decode() == render_html(big_page(500))
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def test_wsgiref_server() -> None:
+    with make_server('127.0.0.1', 0, wsgi_app, handler_class=QuietHandler) as server:
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        connection = HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+        try:
+            connection.request('GET', '/')
+            response = connection.getresponse()
+            assert response.status == 200
+            assert response.getheader('Content-Length') is None
+            assert response.read().decode() == render_html(big_page(500))
+        finally:
+            connection.close()
+            thread.join()
+
+
+def test_asgi() -> None:
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        await asgi_response(big_page(500), send, chunk_size=1000, status=201)
+    messages = run_asgi(app)
+    assert messages[0] == {'type': 'http.response.start', 'status': 201,
+                           'headers': [(b'content-type', b'text/html; charset=utf-8')]}
+    assert all(message['more_body'] for message in messages[1:-1])
+    assert messages[-1] == {'type': 'http.response.body', 'body': b'', 'more_body': False}
+    assert len(messages) > 10
+    assert b''.join(message['body'] for message in messages[1:]).decode() == render_html(big_page(500))
+
+
+def test_asgi_async_document() -> None:
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        await asgi_response(async_page(3), send)
+    messages = run_asgi(app)
+    assert b''.join(message.get('body', b'') for message in messages) == (
+        b'<!doctype html><html><p>0</p><p>1</p><p>2</p></html>')
+
+
+def test_compressed_responses() -> None:
+    headers: List[Any] = []
+    body = b''.join(wsgi_response(big_page(50), lambda status, response_headers: headers.extend(response_headers),
+                                  compress_level=9))
+    assert ('Content-Encoding', 'gzip') in headers
+    assert gzip.decompress(body).decode() == render_html(big_page(50))
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        await asgi_response(big_page(50), send, compress_level=1)
+    messages = run_asgi(app)
+    assert (b'content-encoding', b'gzip') in messages[0]['headers']
+    assert gzip.decompress(b''.join(message['body'] for message in messages[1:])).decode() == render_html(big_page(50))